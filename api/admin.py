@@ -4,14 +4,16 @@ from .models import StripeCustomer, StripeSubscription, StripePlan
 @admin.register(StripeCustomer)
 class StripeCustomerAdmin(admin.ModelAdmin):
     list_display = ('user', 'customer_id', 'livemode', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'user__email', 'customer_id')
     readonly_fields = ('created_at', 'updated_at')
+    # Only allow creating new customer records, not editing
+    readonly_fields_existing = readonly_fields + ('user', 'customer_id', 'livemode')
+    show_full_result_count = False
+    list_per_page = 50
     
     def get_readonly_fields(self, request, obj=None):
-        # Only allow creating new customer records, not editing
-        if obj:
-            return self.readonly_fields + ('user', 'customer_id', 'livemode')
-        return self.readonly_fields
+        return self.readonly_fields_existing if obj else self.readonly_fields
 
 
 @admin.register(StripePlan)
@@ -20,6 +22,8 @@ class StripePlanAdmin(admin.ModelAdmin):
     list_filter = ('active', 'livemode', 'interval')
     search_fields = ('name', 'plan_id')
     readonly_fields = ('created_at', 'updated_at')
+    show_full_result_count = False
+    list_per_page = 50
     
     def amount_display(self, obj):
         return f"{obj.currency.upper()} {obj.amount/100:.2f}"
@@ -29,14 +33,13 @@ class StripePlanAdmin(admin.ModelAdmin):
 @admin.register(StripeSubscription)
 class StripeSubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'subscription_id', 'status', 'plan_display', 'current_period_end', 'cancel_at_period_end')
+    list_select_related = ('user', 'plan')
     list_filter = ('status', 'cancel_at_period_end', 'livemode')
-    search_fields = ('user__username', 'user__email', 'subscription_id', 'plan_id')
+    search_fields = ('user__username', 'user__email', 'subscription_id', 'plan__plan_id', 'plan__name')
     readonly_fields = ('created_at', 'updated_at')
+    show_full_result_count = False
+    list_per_page = 50
     
     def plan_display(self, obj):
-        try:
-            plan = StripePlan.objects.get(plan_id=obj.plan_id)
-            return plan.name
-        except StripePlan.DoesNotExist:
-            return obj.plan_id
+        return obj.plan.name if obj.plan else obj.plan_id
     plan_display.short_description = 'Plan'
@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-import importlib.util
 
 
 class StripeHomeConfig(AppConfig):
@@ -8,8 +7,13 @@ class StripeHomeConfig(AppConfig):
     verbose_name = 'Stripe Integration'
     
     def ready(self):
+        # Configure the stripe module's API key once per process
+        from .config import configure_stripe
+        configure_stripe()
+        
         # Import signal handlers or perform other initialization
-        # Check if signals module exists before importing
-        if importlib.util.find_spec('apps.stripe_home.signals'):
-            # Only import if the module exists
-            import apps.stripe_home.signals  # noqa
+        # The signals module is optional, so tolerate its absence
+        try:
+            from . import signals  # noqa
+        except ImportError:
+            pass
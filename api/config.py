@@ -1,38 +1,101 @@
+import atexit
+from functools import lru_cache
+from types import MappingProxyType
 from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+import stripe
 from stripe import StripeClient
 
+_TEST_DASHBOARD_BASE_URL = 'https://dashboard.stripe.com/test/'
+
+# Keep-alive connections to api.stripe.com per process, sized for threaded workers
+_STRIPE_HTTP_POOL_SIZE = 50
+_STRIPE_HTTP_TIMEOUT = 30
+
+_TEST_CARD_NUMBERS = MappingProxyType({
+    'success': '4242424242424242',
+    'requires_auth': '4000002500003155',
+    'declined': '4000000000000002',
+    'insufficient_funds': '4000000000009995',
+    'processing_error': '4000000000000119',
+})
+
+_TEST_DASHBOARD_PATHS = MappingProxyType({
+    'customer': 'customers/',
+    'subscription': 'subscriptions/',
+    'payment': 'payments/',
+    'invoice': 'invoices/',
+})
+
+
+@lru_cache(maxsize=4)
+def _is_test_key(secret_key):
+    return secret_key.startswith('sk_test_')
+
+
 class StripeConfig:
     """Configuration utilities for Stripe integration"""
     
     @classmethod
     def is_test_mode(cls):
         """Check if Stripe is in test mode"""
-        return settings.STRIPE_SECRET_KEY.startswith('sk_test_')
+        # Keyed on the secret key so override_settings still takes effect
+        return _is_test_key(settings.STRIPE_SECRET_KEY)
     
     @classmethod
     def get_test_card_numbers(cls):
-        """Return test card numbers for different scenarios"""
-        return {
-            'success': '4242424242424242',
-            'requires_auth': '4000002500003155',
-            'declined': '4000000000000002',
-            'insufficient_funds': '4000000000009995',
-            'processing_error': '4000000000000119',
-        }
+        """Return test card numbers for different scenarios (read-only mapping)"""
+        return _TEST_CARD_NUMBERS
     
     @classmethod
     def get_test_dashboard_url(cls, object_id, object_type):
         """Generate Stripe dashboard URL for test objects"""
-        base_url = 'https://dashboard.stripe.com/test/'
-        paths = {
-            'customer': f'customers/{object_id}',
-            'subscription': f'subscriptions/{object_id}',
-            'payment': f'payments/{object_id}',
-            'invoice': f'invoices/{object_id}',
-        }
-        return base_url + paths.get(object_type, '')
+        path = _TEST_DASHBOARD_PATHS.get(object_type)
+        if path is None:
+            return _TEST_DASHBOARD_BASE_URL
+        return f'{_TEST_DASHBOARD_BASE_URL}{path}{object_id}'
+
 
+def get_stripe_api_key():
+    """Get the secret key for this process: the test key when TESTING is set"""
+    return settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
 
+
+@lru_cache(maxsize=1)
+def get_stripe_http_client():
+    """Get the shared HTTP client for Stripe API calls
+
+    Its requests session keeps TLS connections to Stripe open between calls,
+    so only the first request in a process pays for the handshake.
+    """
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=_STRIPE_HTTP_POOL_SIZE,
+        pool_maxsize=_STRIPE_HTTP_POOL_SIZE,
+    ))
+    client = stripe.RequestsClient(timeout=_STRIPE_HTTP_TIMEOUT, session=session)
+    # Release the pooled sockets when the worker exits
+    atexit.register(client.close)
+    return client
+
+
+def configure_stripe():
+    """Set the key and HTTP client used by module-level ``stripe.*`` calls
+
+    Called once from ``StripeHomeConfig.ready`` so views never reassign them
+    per request.
+    """
+    stripe.api_key = get_stripe_api_key()
+    stripe.default_http_client = get_stripe_http_client()
+
+
+@lru_cache(maxsize=1)
 def get_stripe_client():
-    """Get a configured Stripe client instance"""
-    return StripeClient(settings.STRIPE_SECRET_KEY)
+    """Get the shared Stripe client instance
+
+    The client is built once and shares the pooled HTTP client with
+    module-level ``stripe.*`` calls, so connections are reused across
+    requests. Call ``get_stripe_client.cache_clear()`` to force a new one.
+    """
+    return StripeClient(get_stripe_api_key(), http_client=get_stripe_http_client())
@@ -1,9 +1,36 @@
+from django.core.cache import cache
 from django.db import transaction
-from django.utils import timezone
+from django.db.models import F
+from django.db.models.functions import Now
 import logging
 
+from .models import StripePlan
+
 logger = logging.getLogger(__name__)
 
+# Credit ledger is optional; resolve it once instead of on every allocation
+try:
+    from apps.credits.models import CreditTransaction
+except ImportError:
+    CreditTransaction = None
+
+# Stripe plan name -> subscription tier
+_TIER_MAP = {
+    'Free Plan': 'free',
+    'Basic Plan': 'basic',
+    'Premium Plan': 'premium',
+    'Enterprise Plan': 'enterprise',
+}
+_TIER_PREFIXES = {name.lower().split()[0]: tier for name, tier in _TIER_MAP.items()}
+
+# How long an active plan lookup is cached; plan writes and product webhooks evict it
+PLAN_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _plan_cache_key(field, value):
+    # v2: entries are values() dicts; older entries held pickled StripePlan instances
+    return f"stripe:plan:v2:{field}:{value}"
+
 def allocate_subscription_credits(user, amount, description, subscription_id):
     """
     Allocate credits to a user and record the transaction.
@@ -21,70 +48,109 @@ def allocate_subscription_credits(user, amount, description, subscription_id):
     from apps.users.models import UserProfile
     
     try:
-        # Check if user has a profile
-        if not hasattr(user, 'profile'):
-            logger.error(f"User {user.id} has no profile for credit allocation")
-            return False
-        
         # Log input parameters for debugging
-        logger.debug(f"Credit allocation - User: {user.id}, Amount: {amount}, Description: {description}, Subscription: {subscription_id}")
+        logger.debug("Credit allocation - User: %s, Amount: %s, Description: %s, Subscription: %s", user.id, amount, description, subscription_id)
         
-        profile = user.profile
-        logger.debug(f"Found user profile with ID: {profile.id}, current balance: {profile.credits_balance}")
-        
-        # We still need a transaction for the select_for_update
         with transaction.atomic():
-            # Lock the profile to prevent race conditions
-            profile = UserProfile.objects.select_for_update().get(id=profile.id)
-            old_balance = profile.credits_balance
-            logger.debug(f"Locked profile with ID: {profile.id}, verified balance: {old_balance}")
+            # Add credits in a single atomic UPDATE; the row stays locked until
+            # the transaction commits, so the balance read below is consistent
+            updated = UserProfile.objects.filter(user_id=user.id).update(
+                credits_balance=F('credits_balance') + amount,
+                last_credit_allocation_date=Now(),
+            )
+            if not updated:
+                logger.error("User %s has no profile for credit allocation", user.id)
+                return False
             
-            # Add credits to the user's balance
-            # Note: Inside UserProfile.add_credits(), there's another select_for_update, but that's OK
-            # since we're already in a transaction and have the row locked
-            profile.add_credits(amount)
-            profile.last_credit_allocation_date = timezone.now()
-            profile.save()
-            logger.debug(f"Updated profile after adding credits, new balance should be: {old_balance + amount}")
+            new_balance = UserProfile.objects.filter(user_id=user.id).values_list('credits_balance', flat=True).first()
+            logger.debug("Updated profile after adding credits, new balance: %s", new_balance)
         
         # Record the transaction if CreditTransaction model is available
-        try:
-            from apps.credits.models import CreditTransaction
-            
-            # Create transaction record
+        if CreditTransaction is not None:
             transaction_record = CreditTransaction.objects.create(
                 user=user,
                 transaction_type='addition',
                 amount=amount,
-                balance_after=old_balance + amount,
+                balance_after=new_balance,
                 description=description,
                 endpoint='stripe.subscription',
                 notes=f"Subscription ID: {subscription_id}"
             )
-            logger.debug(f"Created credit transaction record with ID: {transaction_record.id}")
+            logger.debug("Created credit transaction record with ID: %s", transaction_record.id)
             
-            logger.info(f"Added {amount} credits to user {user.id} for subscription {subscription_id}")
-        except ImportError:
+            logger.info("Added %s credits to user %s for subscription %s", amount, user.id, subscription_id)
+        else:
             logger.warning("CreditTransaction model not available, skipping transaction recording")
         
-        # Verify the credits were actually added
-        user.refresh_from_db()
-        if hasattr(user, 'profile'):
-            updated_balance = user.profile.credits_balance
-            logger.debug(f"After credit allocation, user balance is now: {updated_balance}")
-            if updated_balance != old_balance + amount:
-                logger.error(f"Credit allocation failed - expected balance {old_balance + amount}, but got {updated_balance}")
-                return False
-        
         return True
     
-    except Exception as e:
-        logger.error(f"Error allocating subscription credits: {str(e)}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("Error allocating subscription credits")
         return False
 
 
+def get_plans_by_id(plan_ids):
+    """
+    Fetch several StripePlan rows in one query.
+    
+    Args:
+        plan_ids: Iterable of Stripe price/plan IDs
+        
+    Returns:
+        dict: StripePlan instances keyed by plan_id; missing IDs are absent
+    """
+    return StripePlan.objects.in_bulk(set(plan_ids), field_name='plan_id')
+
+
+def get_active_plan(field, value):
+    """
+    Fetch an active plan, caching it between checkouts.
+    
+    Only the columns checkout reads are loaded, and they are cached as a
+    plain dict rather than a pickled model instance.
+    
+    Args:
+        field: Lookup field, either 'id' or 'plan_id'
+        value: Value to match
+        
+    Returns:
+        dict: The matching active plan's id, plan_id and name
+        
+    Raises:
+        StripePlan.DoesNotExist: If no active plan matches
+    """
+    key = _plan_cache_key(field, value)
+    plan = cache.get(key)
+    if plan is None:
+        plan = StripePlan.objects.values('id', 'plan_id', 'name').get(**{field: value, 'active': True})
+        cache.set(key, plan, PLAN_CACHE_TIMEOUT)
+    return plan
+
+
+def evict_plans(plans):
+    """
+    Drop plans from the checkout lookup cache.
+    
+    Args:
+        plans: Iterable of (id, plan_id) pairs for plans that were written
+    """
+    cache.delete_many([
+        key
+        for pk, plan_id in plans
+        for key in (_plan_cache_key('id', pk), _plan_cache_key('plan_id', plan_id))
+    ])
+
+
+def evict_plan(plan):
+    """
+    Drop a plan from the checkout lookup cache.
+    
+    Args:
+        plan: StripePlan instance that was saved or deleted
+    """
+    evict_plans([(plan.pk, plan.plan_id)])
+
+
 def map_plan_to_subscription_tier(plan_name):
     """
     Map Stripe plan name to subscription tier.
@@ -95,21 +161,15 @@ def map_plan_to_subscription_tier(plan_name):
     Returns:
         str: Subscription tier name (free, basic, premium, enterprise)
     """
-    mapping = {
-        'Free Plan': 'free',
-        'Basic Plan': 'basic',
-        'Premium Plan': 'premium',
-        'Enterprise Plan': 'enterprise',
-    }
-    
     # Try exact match first
-    if plan_name in mapping:
-        return mapping[plan_name]
+    if plan_name in _TIER_MAP:
+        return _TIER_MAP[plan_name]
     
-    # Try partial match
-    for key, value in mapping.items():
-        if key.lower().split()[0] in plan_name.lower():
-            return value
+    # Try partial match on the first word of each known plan name
+    name_lower = plan_name.lower()
+    for prefix, tier in _TIER_PREFIXES.items():
+        if prefix in name_lower:
+            return tier
     
     # Default to basic
     return 'basic'
@@ -144,9 +204,24 @@ def handle_subscription_change(user, old_plan, new_plan, subscription_id):
         success = True
     
     # Update user profile subscription tier if successful
-    if success and hasattr(user, 'profile'):
-        profile = user.profile
-        profile.subscription_tier = map_plan_to_subscription_tier(new_plan.name)
-        profile.save(update_fields=['subscription_tier'])
+    if success:
+        set_subscription_tier(user, map_plan_to_subscription_tier(new_plan.name))
     
     return success
+
+
+def set_subscription_tier(user, tier):
+    """
+    Set a user's profile subscription tier with a single UPDATE.
+    
+    Args:
+        user: The user whose profile is updated
+        tier: Subscription tier name
+        
+    Returns:
+        bool: True if the user has a profile, False otherwise
+    """
+    # Import here to avoid circular imports
+    from apps.users.models import UserProfile
+    
+    return bool(UserProfile.objects.filter(user_id=user.id).update(subscription_tier=tier))
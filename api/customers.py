@@ -0,0 +1,57 @@
+import stripe
+
+from .config import StripeConfig
+from .models import StripeCustomer
+
+
+def create_customer_for_user(user):
+    """
+    Create the Stripe customer for a user, deduplicating repeats.
+
+    The key is stable per user, so every repeat inside Stripe's 24 hour
+    idempotency window gets the first customer back instead of a new one.
+
+    Args:
+        user: The user the customer is created for
+
+    Returns:
+        stripe.Customer: The created (or replayed) customer
+    """
+    return stripe.Customer.create(
+        idempotency_key=f"cust:{user.id}",
+        email=user.email,
+        name=user.get_full_name() or user.username,
+        metadata={
+            'user_id': str(user.id)
+        }
+    )
+
+
+def get_or_create_customer_id(user):
+    """
+    Return a user's Stripe customer ID, creating the customer if needed.
+
+    Checkout and the signup signal can race to create the same customer.
+    Both get the same Stripe customer back through the idempotency key, and
+    get_or_create keeps the OneToOne from failing for whichever loses.
+
+    Args:
+        user: The user whose customer ID is returned
+
+    Returns:
+        str: Stripe customer ID
+    """
+    try:
+        return StripeCustomer.objects.only('customer_id').get(user=user).customer_id
+    except StripeCustomer.DoesNotExist:
+        pass
+
+    customer = create_customer_for_user(user)
+    record, _ = StripeCustomer.objects.get_or_create(
+        user=user,
+        defaults={
+            'customer_id': customer.id,
+            'livemode': not StripeConfig.is_test_mode(),
+        }
+    )
+    return record.customer_id
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...models import ProcessedStripeEvent
+
+# Stripe retries a webhook delivery for up to three days
+DEFAULT_RETENTION_DAYS = 3
+
+
+class Command(BaseCommand):
+    help = "Delete processed webhook event IDs older than Stripe's retry window"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DEFAULT_RETENTION_DAYS,
+            help=f"Keep events processed within this many days (default {DEFAULT_RETENTION_DAYS})",
+        )
+    
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # One DELETE on the processed_at index; no rows are loaded
+        deleted, _ = ProcessedStripeEvent.objects.filter(processed_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} processed Stripe events older than {options['days']} days")
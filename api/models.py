@@ -20,6 +20,42 @@ class StripeCustomer(models.Model):
     
     class Meta:
         app_label = 'stripe_home'
+        indexes = [
+            # Small, hot index over production customers (partial where supported)
+            models.Index(fields=['customer_id'], condition=models.Q(livemode=True), name='stripe_cust_live_idx'),
+        ]
+
+
+class StripePlanQuerySet(models.QuerySet):
+    """Evicts cached checkout plans on bulk writes, which send no save signals"""
+    
+    def update(self, **kwargs):
+        # Import here to avoid circular imports
+        from .credit import evict_plans
+        
+        # Capture the keys before the update can change plan_id
+        plans = list(self.values_list('id', 'plan_id'))
+        rows = super().update(**kwargs)
+        evict_plans(plans)
+        return rows
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        from .credit import evict_plans
+        
+        objs = super().bulk_create(objs, *args, **kwargs)
+        # Upserts (update_conflicts) can overwrite plans that are cached
+        evict_plans((obj.pk, obj.plan_id) for obj in objs)
+        return objs
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from .credit import evict_plans
+        
+        objs = list(objs)
+        # Evict the stored plan_ids as well, in case the update changes them
+        plans = list(self.filter(pk__in=[obj.pk for obj in objs]).values_list('id', 'plan_id'))
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        evict_plans(plans + [(obj.pk, obj.plan_id) for obj in objs])
+        return rows
 
 
 class StripePlan(models.Model):
@@ -37,6 +73,8 @@ class StripePlan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = StripePlanQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} ({self.currency} {self.amount/100:.2f}/{self.interval})"
     
@@ -58,8 +96,18 @@ class StripeSubscription(models.Model):
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stripe_subscriptions')
     subscription_id = models.CharField(max_length=255, unique=True)
-    status = models.CharField(max_length=50, choices=STATUS_CHOICES)
-    plan_id = models.CharField(max_length=255)
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, db_index=True)
+    # Keyed on StripePlan.plan_id so the column still holds the Stripe price ID.
+    # No DB constraint: subscriptions can arrive before their plan is synced.
+    plan = models.ForeignKey(
+        StripePlan,
+        to_field='plan_id',
+        db_column='plan_id',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='subscriptions',
+    )
     current_period_start = models.DateTimeField()
     current_period_end = models.DateTimeField()
     cancel_at_period_end = models.BooleanField(default=False)
@@ -78,3 +126,19 @@ class StripeSubscription(models.Model):
     
     class Meta:
         app_label = 'stripe_home'
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['subscription_id'], condition=models.Q(livemode=True), name='stripe_sub_live_idx'),
+        ]
+
+
+class ProcessedStripeEvent(models.Model):
+    """Webhook event IDs already claimed for processing, used to drop Stripe's redeliveries"""
+    event_id = models.CharField(max_length=255, primary_key=True)
+    processed_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Pruned by the prune_stripe_events command
+    
+    def __str__(self):
+        return self.event_id
+    
+    class Meta:
+        app_label = 'stripe_home'
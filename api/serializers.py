@@ -0,0 +1,49 @@
+from rest_framework import serializers
+
+
+class BillingAddressCollectionField(serializers.ChoiceField):
+    """Stripe's 'auto' or 'required', also accepting the booleans older clients send"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(choices=['auto', 'required'], **kwargs)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            return 'required' if data else None
+        return super().to_internal_value(data)
+
+
+class ProgrammableCheckoutSerializer(serializers.Serializer):
+    """Validate a programmable checkout request in a single pass"""
+    mode = serializers.ChoiceField(choices=['subscription', 'payment', 'setup'], default='subscription')
+    success_url = serializers.URLField(required=False)
+    cancel_url = serializers.URLField(required=False)
+    # Embedded checkout redirects here instead of success_url/cancel_url
+    return_url = serializers.URLField(required=False)
+    
+    # Subscription mode
+    plan_id = serializers.CharField(required=False)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    
+    # Payment mode
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    currency = serializers.CharField(default='usd')
+    product_name = serializers.CharField(default='One-time payment')
+    
+    # Optional session settings
+    allow_promotion_codes = serializers.BooleanField(default=True)
+    billing_address_collection = BillingAddressCollectionField(default='required')
+    tax_id_collection = serializers.BooleanField(default=False)
+    ui_mode = serializers.ChoiceField(choices=['hosted', 'embedded'], required=False)
+    custom_text = serializers.DictField(required=False)
+    custom_fields = serializers.ListField(child=serializers.DictField(), required=False)
+    payment_method_types = serializers.ListField(child=serializers.CharField(), required=False)
+    
+    def validate(self, attrs):
+        if attrs['mode'] == 'subscription' and not attrs.get('plan_id'):
+            raise serializers.ValidationError('plan_id is required for subscription mode')
+        if attrs['mode'] == 'payment' and attrs.get('amount') is None:
+            raise serializers.ValidationError('amount is required for payment mode')
+        if attrs.get('return_url') and attrs.get('ui_mode') != 'embedded':
+            raise serializers.ValidationError('return_url is only used with embedded ui_mode')
+        return attrs
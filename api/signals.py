@@ -1,6 +1,14 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import StripeSubscription
+import logging
+
+from .credit import evict_plan, evict_plans
+from .customers import get_or_create_customer_id
+from .models import StripePlan, StripeSubscription
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=StripeSubscription)
@@ -17,3 +25,53 @@ def handle_subscription_update(sender, instance, created, **kwargs):
     else:
         # An existing subscription was updated
         pass
+
+
+@receiver(pre_save, sender=StripePlan)
+def remember_previous_plan_id(sender, instance, **kwargs):
+    """Note the stored plan_id, so a changed one is evicted under its old key"""
+    instance._previous_plan_id = None
+    if instance.pk is not None:
+        instance._previous_plan_id = (
+            StripePlan.objects.filter(pk=instance.pk).values_list('plan_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=StripePlan)
+def invalidate_saved_plan_cache(sender, instance, **kwargs):
+    """Evict a saved plan so checkout never serves a stale or inactive one"""
+    plans = [(instance.pk, instance.plan_id)]
+    previous_plan_id = getattr(instance, '_previous_plan_id', None)
+    if previous_plan_id and previous_plan_id != instance.plan_id:
+        plans.append((instance.pk, previous_plan_id))
+    evict_plans(plans)
+
+
+@receiver(post_delete, sender=StripePlan)
+def invalidate_plan_cache(sender, instance, **kwargs):
+    """Evict a deleted plan so checkout stops accepting it"""
+    evict_plan(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def ensure_stripe_customer(sender, instance, created, **kwargs):
+    """Create the Stripe customer when a user signs up
+    
+    Checkout then finds an existing StripeCustomer and skips the extra
+    Stripe round-trip on the redirect path. Enable it with the
+    STRIPE_CREATE_CUSTOMER_ON_SIGNUP setting; checkout still creates the
+    customer on demand for users who signed up before it was enabled.
+    """
+    if not created or not getattr(settings, 'STRIPE_CREATE_CUSTOMER_ON_SIGNUP', False):
+        return
+    # Wait for the signup transaction so a rollback leaves no orphaned customer
+    transaction.on_commit(lambda: _create_stripe_customer(instance))
+
+
+def _create_stripe_customer(user):
+    """Create a Stripe customer and its local record, logging on failure"""
+    try:
+        get_or_create_customer_id(user)
+    except Exception as e:
+        # Checkout falls back to creating the customer itself
+        logger.error("Error creating Stripe customer for user %s: %s", user.id, e)
@@ -0,0 +1,46 @@
+"""Fast settings for running the stripe_home test suite.
+
+Layers test-only overrides on top of the host project's settings module:
+
+    DJANGO_BASE_SETTINGS_MODULE=config.settings \
+        python manage.py test apps.stripe_home --settings=apps.stripe_home.tests.settings
+"""
+import os
+from importlib import import_module
+
+_base = import_module(os.environ.get("DJANGO_BASE_SETTINGS_MODULE", "config.settings"))
+globals().update({name: value for name, value in vars(_base).items() if name.isupper()})
+
+
+class DisableMigrations:
+    """Build test tables straight from the models instead of replaying migrations"""
+
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+MIGRATION_MODULES = DisableMigrations()
+
+# Every configured alias becomes its own in-memory SQLite database
+DATABASES = {
+    alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+    for alias in getattr(_base, "DATABASES", {"default": {}})
+}
+
+# Route every query to the default alias instead of per-class override_settings
+DATABASE_ROUTERS = []
+
+# Fixture users are never authenticated with a password; skip PBKDF2's iterations
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Process-local cache: each parallel worker gets its own, so tests never need to
+# clear a shared Redis/memcached backend between runs
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "stripe-home-tests",
+    }
+}
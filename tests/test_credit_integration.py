@@ -1,14 +1,16 @@
-from django.test import override_settings, TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.conf import settings
 from apps.stripe_home.models import StripeCustomer, StripePlan, StripeSubscription
+from apps.stripe_home import credit
 from apps.stripe_home.config import get_stripe_client
 from apps.users.models import UserProfile
 import stripe
 import uuid
 import logging
-from unittest.mock import patch
+from unittest.mock import MagicMock, create_autospec, patch
+from concurrent.futures import ThreadPoolExecutor
 import os
 import unittest
 
@@ -18,376 +20,337 @@ logger = logging.getLogger(__name__)
 # Get the User model
 User = get_user_model()
 
+# Build the allocate_subscription_credits spec once; patch(..., autospec=True)
+# re-inspects the signature for every test. Tests reset it before use.
+ALLOCATE_TARGET = 'apps.stripe_home.credit.allocate_subscription_credits'
+_ALLOC_SPEC = create_autospec(credit.allocate_subscription_credits)
+
 # Set Stripe API key from environment or settings
 stripe.api_key = os.environ.get(
     "STRIPE_SECRET_KEY_TEST", settings.STRIPE_SECRET_KEY_TEST
 )
 
+# Point the SDK at a local stripe-mock server (e.g. http://localhost:12111) when
+# available so fixture objects are created without hitting api.stripe.com
+STRIPE_MOCK_URL = os.environ.get("STRIPE_MOCK_URL")
+if STRIPE_MOCK_URL:
+    stripe.api_base = STRIPE_MOCK_URL
+    stripe.api_key = "sk_test_123"
+
+# Skip the whole module before any class is built if there is no test API key
+if not (stripe.api_key or "").startswith("sk_test_"):
+    raise unittest.SkipTest("Skipping Stripe tests: no valid test API key")
+
 logger.info(f"Using Stripe API test key starting with {stripe.api_key[:8]}")
-stripe.log = "info"
+# "info" dumps every request/response body to stderr; opt in via STRIPE_LOG
+stripe.log = os.environ.get("STRIPE_LOG", "warn")
 
 # Set the API version to the latest (use Stripe's recommended version)
 stripe.api_version = os.environ.get("STRIPE_API_VERSION", "2023-10-16")
 
-# Skip tests if no API key
-if not stripe.api_key or not stripe.api_key.startswith("sk_test_"):
-    unittest.skip("Skipping Stripe tests: no valid test API key")
 
-@unittest.skipIf(
-    not stripe.api_key or not stripe.api_key.startswith("sk_test_"), "Skipping test that requires a valid Stripe API key"
-)
-# Override database router settings to ensure all operations go to the default database
-@override_settings(DATABASE_ROUTERS=[])
+def _delete_stripe_object(item):
+    """Delete one (resource class, id) pair, logging instead of raising"""
+    resource, object_id = item
+    try:
+        resource.delete(object_id)
+    except stripe.error.StripeError as e:
+        logger.warning(f"Error cleaning up Stripe test object {object_id}: {str(e)}")
+
+
 class StripeCreditIntegrationTest(TestCase):
-    # Explicitly specify all databases to ensure test setup creates tables in all of them
-    databases = {"default", "local", "supabase"}  # Include all databases that might be accessed
-    
+    # tests/settings.py disables routers, so every query goes to the default
+    # alias; opt a class into other aliases only if it really touches them
+    databases = {"default"}
+
     @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        logger.info("Using multiple databases for tests to prevent routing errors")
+    def setUpTestData(cls):
+        # Fixtures are created once per class; each test runs in a savepoint
+        # that is rolled back, and Django hands every test a fresh copy.
 
-    def setUp(self):
-        # Get Stripe client
-        self.stripe = get_stripe_client()
+        # Single reference time so period dates are deterministic across tests
+        cls.NOW = timezone.now()
 
         # Create test user
-        self.user = User.objects.create_user(
-            username="testuser", email="test@example.com", password="testpassword"
-        )
+        # Unique names keep parallel workers and --keepdb reruns from colliding
+        suffix = uuid.uuid4().hex[:8]
+        # No test authenticates, so skip password hashing entirely
+        cls.user = User(username=f"testuser-{suffix}", email=f"test-{suffix}@example.com")
+        cls.user.set_unusable_password()
+        cls.user.save()
 
-        # Create user profile if it doesn't exist
-        if not hasattr(self.user, "profile"):
-            # Create a real UserProfile instance
-            UserProfile.objects.create(
-                user=self.user,
-                supabase_uid=f"test-{uuid.uuid4()}",
-                credits_balance=0,
-                subscription_tier="free",
-            )
-        else:
-            # Reset credits balance if profile exists
-            self.user.profile.credits_balance = 0
-            self.user.profile.save()
-
-        # Create test plan with credits - IMPORTANT: Skip any credit allocation checks
-        self.plan = StripePlan.objects.create(
-            plan_id="price_123456",
-            name="Test Plan",
-            amount=1999,  # $19.99
-            currency="usd",
-            interval="month",
-            initial_credits=100,
-            monthly_credits=50,
-            active=True,
-            livemode=False,
+        # The user was just created, so it cannot have a profile yet; assigning
+        # the one-to-one also caches it on cls.user.profile without a SELECT
+        cls.profile = UserProfile.objects.create(
+            user=cls.user,
+            supabase_uid=f"test-{suffix}",
+            credits_balance=0,
+            subscription_tier="free",
         )
 
+        # Create the test plan and the higher tier upgrade plan in one INSERT
+        StripePlan.objects.bulk_create([
+            StripePlan(
+                plan_id="price_123456",
+                name="Test Plan",
+                amount=1999,  # $19.99
+                currency="usd",
+                interval="month",
+                initial_credits=100,
+                monthly_credits=50,
+                active=True,
+                livemode=False,
+            ),
+            StripePlan(
+                name="Premium",
+                plan_id="premium_plan",
+                amount=1999,  # 19.99 in cents
+                currency="usd",
+                interval="month",
+                initial_credits=100,
+                monthly_credits=50,
+                features={"premium_feature": True},
+            ),
+        ])
+        # Read them back so every backend hands us primary keys
+        plans = StripePlan.objects.in_bulk(["price_123456", "premium_plan"], field_name="plan_id")
+        cls.plan = plans["price_123456"]
+        cls.premium_plan = plans["premium_plan"]
+
         # Create test Stripe customer
-        self.stripe_customer = stripe.Customer.create(
-            email=self.user.email,
+        cls.stripe_customer = stripe.Customer.create(
+            email=cls.user.email,
             name=f"Test User {uuid.uuid4()}",
-            metadata={"django_user_id": self.user.id},
+            metadata={"django_user_id": cls.user.id},
         )
 
         # Store the Stripe customer ID in our local model
-        self.customer = StripeCustomer.objects.create(
-            user=self.user,
-            customer_id=self.stripe_customer.id,
+        cls.customer = StripeCustomer.objects.create(
+            user=cls.user,
+            customer_id=cls.stripe_customer.id,
             livemode=False,
         )
 
-        # Create a Stripe Product and Price for testing
-        self.stripe_product = stripe.Product.create(
+        # Shared active subscription; tests mutate status/plan in their savepoint
+        cls.subscription = StripeSubscription.objects.create(
+            user=cls.user,
+            subscription_id=f"sub_test_{uuid.uuid4()}",
+            status="active",
+            plan_id=cls.plan.plan_id,
+            current_period_start=cls.NOW,
+            current_period_end=cls.NOW + timezone.timedelta(days=30),
+            cancel_at_period_end=False,
+            livemode=False,
+        )
+
+        # Create a Stripe Product and its Price in a single round-trip
+        cls.stripe_product = stripe.Product.create(
             name="Test Product",
             description="Test product for subscription",
-            metadata={"plan_id": self.plan.id},
+            metadata={"plan_id": cls.plan.id},
+            default_price_data={
+                "unit_amount": cls.plan.amount,
+                "currency": cls.plan.currency,
+                "recurring": {"interval": cls.plan.interval},
+            },
         )
+        cls.stripe_price = cls.stripe_product.default_price
 
-        self.stripe_price = stripe.Price.create(
-            product=self.stripe_product.id,
-            unit_amount=self.plan.amount,
-            currency=self.plan.currency,
-            recurring={"interval": self.plan.interval},
-            metadata={"django_plan_id": self.plan.id},
-        )
+        # Remote objects removed in tearDownClass
+        cls._to_delete = [
+            (stripe.Customer, cls.stripe_customer.id),
+            (stripe.Product, cls.stripe_product.id),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        # stripe-mock is stateless, so there is nothing to clean up remotely
+        if not STRIPE_MOCK_URL:
+            # Clean up Stripe test objects to prevent conflicts in future test runs;
+            # the deletes are independent, so issue them concurrently
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(_delete_stripe_object, cls._to_delete))
+        super().tearDownClass()
 
-    def tearDown(self):
-        # Clean up Stripe test objects to prevent conflicts in future test runs
-        try:
-            stripe.Customer.delete(self.stripe_customer.id)
-            stripe.Product.delete(self.stripe_product.id)
-        except stripe.error.StripeError as e:
-            logger.warning(f"Error cleaning up Stripe test objects: {str(e)}")
-        super().tearDown()
-
-    def test_initial_credit_allocation(self):
-        """Test allocating initial credits when subscription is created"""
-        logger.info("Starting test_initial_credit_allocation...")
-
-        # CRITICAL FIX: Patch the function BEFORE importing it
-        # This ensures the import gets the patched version
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return True
-            mock_allocate.return_value = True
-            
-            # Call the function through the module
-            from apps.stripe_home import credit
-            subscription_id = f"sub_test_{uuid.uuid4()}"
-            description = f"Initial credits for {self.plan.name} subscription"
-            success = credit.allocate_subscription_credits(
-                self.user,
-                self.plan.initial_credits,
-                description,
-                subscription_id
-            )
-            
-            # Assert that our mock was called with the right parameters
-            mock_allocate.assert_called_once_with(
-                self.user,
-                self.plan.initial_credits,
-                description,
-                subscription_id
-            )
-            
-            # Since we've mocked it to return True, this should pass
-            self.assertTrue(success, "Credit allocation should succeed")
-            
-            # Simulate credit transaction and balance update
-            self.user.profile.credits_balance = self.plan.initial_credits
-            
-            # Verify the simulated balance
-            self.assertEqual(
-                self.user.profile.credits_balance,
-                self.plan.initial_credits,
-                f"User should have {self.plan.initial_credits} credits after allocation"
-            )
-
-    def test_monthly_credit_allocation(self):
-        """Test allocating monthly credits when invoice payment succeeds"""
-        # CRITICAL FIX: Patch the function BEFORE importing it
-        # This ensures the import gets the patched version
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return True
-            mock_allocate.return_value = True
-            
-            # Call the function through the module
-            from apps.stripe_home import credit
-            subscription_id = f"sub_test_{uuid.uuid4()}"
-            description = f"Monthly credits for {self.plan.name} subscription"
-            success = credit.allocate_subscription_credits(
-                self.user,
-                self.plan.monthly_credits,
-                description,
-                subscription_id
-            )
-            
-            # Assert that our mock was called with the right parameters
-            mock_allocate.assert_called_once_with(
-                self.user,
-                self.plan.monthly_credits,
-                description,
-                subscription_id
-            )
-            
-            # Since we've mocked it to return True, this should pass
-            self.assertTrue(success, "Credit allocation should succeed")
-            
-            # Simulate credit transaction and balance update
-            self.user.profile.credits_balance = self.plan.monthly_credits
-            
-            # Verify the simulated balance
-            self.assertEqual(
-                self.user.profile.credits_balance,
-                self.plan.monthly_credits,
-                f"User should have {self.plan.monthly_credits} credits after allocation"
-            )
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # One client per class; set outside setUpTestData so it is never deep-copied
+        cls.stripe = get_stripe_client()
 
+    @patch(ALLOCATE_TARGET, new=_ALLOC_SPEC)
     def test_subscription_cancellation(self):
         """Test cancelling a subscription at period end"""
-        # CRITICAL FIX: Patch the function BEFORE importing it
-        # This ensures the import gets the patched version
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return True
-            mock_allocate.return_value = True
-            
-            # Create a fake subscription
-            subscription_id = f"sub_test_{uuid.uuid4()}"
-            
-            # Store the subscription in the database
-            db_subscription = StripeSubscription.objects.create(
-                user=self.user,
-                subscription_id=subscription_id,
-                status="active",
-                plan_id=self.plan.plan_id,
-                current_period_start=timezone.now(),
-                current_period_end=timezone.now() + timezone.timedelta(days=30),
-                cancel_at_period_end=False,
-                livemode=False,
-            )
-            
-            # Simulate cancellation (just update the database record)
-            db_subscription.cancel_at_period_end = True
-            db_subscription.save()
-            
-            # Verify subscription is marked as to be canceled
-            db_subscription.refresh_from_db()
-            self.assertTrue(db_subscription.cancel_at_period_end, "Subscription should be marked for cancellation")
-            
-            # User should keep access until the end of the period
-            self.assertEqual(db_subscription.status, "active", "Subscription should remain active until period end")
+        mock_allocate = _ALLOC_SPEC
+        mock_allocate.reset_mock()
+        # Configure the mock to return True
+        mock_allocate.return_value = True
+        
+        # Reuse the shared active subscription
+        db_subscription = self.subscription
+        
+        # Simulate cancellation (just update the database record)
+        db_subscription.cancel_at_period_end = True
+        db_subscription.save()
+        
+        # Verify subscription is marked as to be canceled
+        db_subscription.refresh_from_db()
+        self.assertTrue(db_subscription.cancel_at_period_end, "Subscription should be marked for cancellation")
+        
+        # User should keep access until the end of the period
+        self.assertEqual(db_subscription.status, "active", "Subscription should remain active until period end")
 
+    @patch(ALLOCATE_TARGET, new=_ALLOC_SPEC)
     def test_payment_failure_handling(self):
         """Test system properly handles failed payments"""
-        # CRITICAL FIX: Use mocking approach instead of trying to actually create failing payments
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return False to simulate failure
-            mock_allocate.return_value = False
-            
-            # Create a test subscription
-            subscription_id = f"sub_test_fail_{uuid.uuid4()}"
-            
-            # Store the subscription in the database
-            db_subscription = StripeSubscription.objects.create(
-                user=self.user,
-                subscription_id=subscription_id,
-                status="past_due",  # Simulate failed payment status
-                plan_id=self.plan.plan_id,
-                current_period_start=timezone.now() - timezone.timedelta(days=5),  # Started 5 days ago
-                current_period_end=timezone.now() + timezone.timedelta(days=25),  # 25 days remaining
-                cancel_at_period_end=False,
-                livemode=False,
-            )
-            
-            # Verify subscription is marked as past_due
-            self.assertEqual(db_subscription.status, "past_due", "Subscription should be marked as past_due")
-            
-            # Credits should remain unchanged when payment fails
-            self.assertEqual(self.user.profile.credits_balance, 0, "Credit balance should remain unchanged after payment failure")
-
-    def test_simple_credit_allocation(self):
-        """A simplified test that focuses just on credit allocation to isolate the issue"""
-        # CRITICAL FIX: Patch the function BEFORE importing it
-        # This ensures the import gets the patched version
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return True
-            mock_allocate.return_value = True
-            
-            # Call the function through the module
-            from apps.stripe_home import credit
-            subscription_id = f"sub_test_{uuid.uuid4()}"
-            description = "Test credit allocation"
-            test_credits = 25
-            success = credit.allocate_subscription_credits(
-                self.user,
-                test_credits,
-                description,
-                subscription_id
-            )
-            
-            # Assert that our mock was called with the right parameters
-            mock_allocate.assert_called_once_with(
-                self.user,
-                test_credits, 
-                description,
-                subscription_id
-            )
-            
-            # Since we've mocked it to return True, this should pass
-            self.assertTrue(success, "Credit allocation should succeed")
-            
-            # Simulate credit transaction and balance update
-            self.user.profile.credits_balance = test_credits
-            
-            # Verify the simulated balance
-            self.assertEqual(
-                self.user.profile.credits_balance,
-                test_credits,
-                f"User should have {test_credits} credits after allocation"
-            )
+        mock_allocate = _ALLOC_SPEC
+        mock_allocate.reset_mock()
+        # Configure the mock to return False to simulate failure
+        mock_allocate.return_value = False
+        
+        # Mark the shared subscription as failing payment
+        db_subscription = self.subscription
+        db_subscription.status = "past_due"  # Simulate failed payment status
+        db_subscription.current_period_start = self.NOW - timezone.timedelta(days=5)  # Started 5 days ago
+        db_subscription.current_period_end = self.NOW + timezone.timedelta(days=25)  # 25 days remaining
+        db_subscription.save(update_fields=["status", "current_period_start", "current_period_end"])
+        
+        # Verify subscription is marked as past_due
+        self.assertEqual(db_subscription.status, "past_due", "Subscription should be marked as past_due")
+        
+        # Credits should remain unchanged when payment fails
+        self.assertEqual(self.user.profile.credits_balance, 0, "Credit balance should remain unchanged after payment failure")
 
+    @patch(ALLOCATE_TARGET, new=_ALLOC_SPEC)
     def test_subscription_upgrade(self):
         """Test upgrading a subscription to a higher tier plan"""
-        # Create a higher tier plan
-        premium_plan = StripePlan.objects.create(
-            name="Premium",
-            plan_id="premium_plan",
-            amount=1999,  # 19.99 in cents
+        mock_allocate = _ALLOC_SPEC
+        mock_allocate.reset_mock()
+        # Higher tier plan created in setUpTestData
+        premium_plan = self.premium_plan
+        
+        # Configure the mock to return True
+        mock_allocate.return_value = True
+        
+        # Reuse the shared active subscription
+        db_subscription = self.subscription
+        subscription_id = db_subscription.subscription_id
+        
+        # Test initial credit allocation
+        description = f"Initial credits for {self.plan.name} subscription"
+        success = credit.allocate_subscription_credits(
+            self.user,
+            self.plan.initial_credits,
+            description,
+            subscription_id
+        )
+
+        # Assert that our mock was called with the right parameters
+        mock_allocate.assert_called_with(
+            self.user,
+            self.plan.initial_credits,
+            description,
+            subscription_id
+        )
+
+        # Since we've mocked it to return True, this should pass
+        self.assertTrue(success, "Credit allocation should succeed")
+
+        # Simulate the upgrade process - instead of using real Stripe API
+        # Update the subscription in the database to reflect the upgrade
+        db_subscription.plan_id = premium_plan.plan_id
+        db_subscription.save()
+        
+        # Reset the mock call count for the second test
+        mock_allocate.reset_mock()
+        
+        # Now allocate credits for the upgraded plan
+        upgrade_description = f"Upgrade credits for {premium_plan.name} subscription"
+        upgrade_credits = premium_plan.initial_credits - self.plan.initial_credits
+        
+        # Call the credit allocation function for the upgrade
+        upgrade_success = credit.allocate_subscription_credits(
+            self.user,
+            upgrade_credits,
+            upgrade_description,
+            subscription_id
+        )
+        
+        # Verify the upgrade credit allocation was called with correct parameters
+        mock_allocate.assert_called_with(
+            self.user,
+            upgrade_credits,
+            upgrade_description,
+            subscription_id
+        )
+        
+        # Verify the result
+        self.assertTrue(upgrade_success, "Upgrade credit allocation should succeed")
+
+
+class StripeCreditMockOnlyTest(SimpleTestCase):
+    """Credit allocation tests that only exercise mocks, so no database is needed"""
+
+    def setUp(self):
+        # In-memory stand-ins; none of these tests read or write rows
+        self.user = MagicMock(id=1)
+        self.user.profile.credits_balance = 0
+        self.plan = StripePlan(
+            plan_id="price_123456",
+            name="Test Plan",
+            amount=1999,  # $19.99
             currency="usd",
             interval="month",
             initial_credits=100,
             monthly_credits=50,
-            features={"premium_feature": True},
+            active=True,
+            livemode=False,
         )
-        
-        # CRITICAL FIX: Use consistent mocking approach throughout the test
-        with patch('apps.stripe_home.credit.allocate_subscription_credits', autospec=True) as mock_allocate:
-            # Configure the mock to return True
-            mock_allocate.return_value = True
-            
-            # Call the function through the module to test initial allocation
-            from apps.stripe_home import credit
-            subscription_id = f"sub_test_{uuid.uuid4()}"
-            
-            # Create a database subscription record for testing
-            db_subscription = StripeSubscription.objects.create(
-                user=self.user,
-                subscription_id=subscription_id,
-                status="active",
-                plan_id=self.plan.plan_id,
-                current_period_start=timezone.now(),
-                current_period_end=timezone.now() + timezone.timedelta(days=30),
-                cancel_at_period_end=False,
-                livemode=False
-            )
-            
-            # Test initial credit allocation
-            description = f"Initial credits for {self.plan.name} subscription"
-            success = credit.allocate_subscription_credits(
-                self.user,
-                self.plan.initial_credits,
-                description,
-                subscription_id
-            )
-
-            # Assert that our mock was called with the right parameters
-            mock_allocate.assert_called_with(
-                self.user,
-                self.plan.initial_credits,
-                description,
-                subscription_id
-            )
-
-            # Since we've mocked it to return True, this should pass
-            self.assertTrue(success, "Credit allocation should succeed")
-
-            # Simulate the upgrade process - instead of using real Stripe API
-            # Update the subscription in the database to reflect the upgrade
-            db_subscription.plan_id = premium_plan.plan_id
-            db_subscription.save()
-            
-            # Reset the mock call count for the second test
-            mock_allocate.reset_mock()
-            
-            # Now allocate credits for the upgraded plan
-            upgrade_description = f"Upgrade credits for {premium_plan.name} subscription"
-            upgrade_credits = premium_plan.initial_credits - self.plan.initial_credits
-            
-            # Call the credit allocation function for the upgrade
-            upgrade_success = credit.allocate_subscription_credits(
-                self.user,
-                upgrade_credits,
-                upgrade_description,
-                subscription_id
-            )
-            
-            # Verify the upgrade credit allocation was called with correct parameters
-            mock_allocate.assert_called_with(
-                self.user,
-                upgrade_credits,
-                upgrade_description,
-                subscription_id
-            )
-            
-            # Verify the result
-            self.assertTrue(upgrade_success, "Upgrade credit allocation should succeed")
+
+    @patch(ALLOCATE_TARGET, new=_ALLOC_SPEC)
+    def test_credit_allocation_variants(self):
+        """Test initial, monthly and ad-hoc credit allocations share one setUp"""
+        mock_allocate = _ALLOC_SPEC
+        mock_allocate.reset_mock()
+        # Configure the mock to return True
+        mock_allocate.return_value = True
+
+        variants = [
+            (self.plan.initial_credits, f"Initial credits for {self.plan.name} subscription"),
+            (self.plan.monthly_credits, f"Monthly credits for {self.plan.name} subscription"),
+            (25, "Test credit allocation"),
+        ]
+        for credits, description in variants:
+            with self.subTest(credits=credits, description=description):
+                mock_allocate.reset_mock()
+                self.user.profile.credits_balance = 0
+
+                # Call the function through the module
+                subscription_id = f"sub_test_{uuid.uuid4()}"
+                success = credit.allocate_subscription_credits(
+                    self.user,
+                    credits,
+                    description,
+                    subscription_id
+                )
+
+                # Assert that our mock was called with the right parameters
+                mock_allocate.assert_called_once_with(
+                    self.user,
+                    credits,
+                    description,
+                    subscription_id
+                )
+
+                # Since we've mocked it to return True, this should pass
+                self.assertTrue(success, "Credit allocation should succeed")
+
+                # Simulate credit transaction and balance update
+                self.user.profile.credits_balance = credits
+
+                # Verify the simulated balance
+                self.assertEqual(
+                    self.user.profile.credits_balance,
+                    credits,
+                    f"User should have {credits} credits after allocation"
+                )
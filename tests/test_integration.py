@@ -1,12 +1,11 @@
 import json
-from datetime import datetime, timedelta
-from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-from django.test import TestCase, override_settings
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import F
 
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -16,6 +15,7 @@ import stripe
 import os
 import unittest
 import uuid
+from pathlib import Path
 
 # Import all the necessary models
 from apps.stripe_home.models import StripePlan, StripeCustomer, StripeSubscription
@@ -34,6 +34,13 @@ User = get_user_model()
 # Get the test key, ensuring it's a test key (prefer the dedicated test key)
 STRIPE_API_KEY = os.environ.get('STRIPE_SECRET_KEY_TEST', settings.STRIPE_SECRET_KEY)
 
+# Replay against a local stripe-mock server (e.g. http://localhost:12111) instead
+# of api.stripe.com; leave unset for the nightly run against the real test API
+STRIPE_MOCK_URL = os.environ.get('STRIPE_MOCK_URL')
+if STRIPE_MOCK_URL:
+    stripe.api_base = STRIPE_MOCK_URL
+    STRIPE_API_KEY = 'sk_test_123'
+
 # Validate the key format - must be a test key for tests
 if not STRIPE_API_KEY or not STRIPE_API_KEY.startswith('sk_test_'):
     logger.warning("STRIPE_SECRET_KEY is not a valid test key. Tests requiring Stripe API will be skipped.")
@@ -47,33 +54,82 @@ else:
 # Get webhook secret for testing
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET_TEST', settings.STRIPE_WEBHOOK_SECRET)
 
+# Canned webhook payloads
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+class StripeCleanupMixin:
+    """Shared Stripe-side cleanup for classes that create a product, price and customer"""
+    
+    @classmethod
+    def _cleanup_stripe_resources(cls):
+        """Delete the customer and archive the price and product"""
+        # Deleting the customer also cancels its subscriptions and detaches
+        # its payment methods, so one call covers everything the tests created
+        try:
+            if getattr(cls, 'stripe_customer', None):
+                stripe.Customer.delete(cls.stripe_customer.id)
+        except stripe.error.InvalidRequestError as e:
+            # Customer already gone
+            logger.warning(f"Error deleting customer: {e}")
+            
+        try:
+            if getattr(cls, 'stripe_price', None):
+                # Archive the price in Stripe
+                stripe.Price.modify(cls.stripe_price.id, active=False)
+        except Exception as e:
+            logger.warning(f"Error archiving price: {e}")
+            
+        try:
+            if getattr(cls, 'stripe_product', None):
+                # Archive the product in Stripe
+                stripe.Product.modify(cls.stripe_product.id, active=False)
+        except Exception as e:
+            logger.warning(f"Error archiving product: {e}")
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up Stripe resources; database rows are rolled back by Django"""
+        # stripe-mock is stateless, so there is nothing to clean up remotely
+        if not STRIPE_MOCK_URL:
+            cls._cleanup_stripe_resources()
+        super().tearDownClass()
+
+
 @unittest.skipIf(not USE_REAL_STRIPE_API, "Skipping test that requires a valid Stripe API key")
 @override_settings(DATABASE_ROUTERS=[])  # Disable database routers for tests
-class StripeIntegrationTestCase(TestCase):
+class StripeIntegrationTestCase(StripeCleanupMixin, TestCase):
     """Integration tests for Stripe functionality with real API calls"""
     
     # Explicitly specify all databases to ensure test setup creates tables in all of them
     databases = {"default", "local", "supabase"}  # Include all databases that might be accessed
+    # Django builds self.client from this before setUp, so don't build a second one
+    client_class = APIClient
     
-    def setUp(self):
-        """Set up test environment"""
+    @classmethod
+    def setUpTestData(cls):
+        """Set up fixtures once per class; each test runs in a rolled-back savepoint"""
         logger.info("Using multiple databases for tests to prevent routing errors")
-        self.user = User.objects.create_user(
-            username='testuser',
-            email='test@example.com',
+        cls.portal_url = reverse('stripe:customer_portal')
+        
+        # Unique names keep parallel workers and shared Stripe test accounts apart
+        cls.run_id = uuid.uuid4().hex[:8]
+        cls.user = User.objects.create_user(
+            username=f'testuser-{cls.run_id}',
+            email=f'test-{cls.run_id}@example.com',
             password='testpass'
         )
         
         # Create user profile
         UserProfile.objects.create(
-            user=self.user,
-            supabase_uid='test_supabase_uid',
+            user=cls.user,
+            supabase_uid=f'test_supabase_uid-{cls.run_id}',
             subscription_tier='free',
             credits_balance=0
         )
         
         # Create test plan
-        self.plan = StripePlan.objects.create(
+        cls.plan = StripePlan.objects.create(
             name="Test Plan",
             amount=1000,  # $10.00
             currency="usd",
@@ -86,65 +142,57 @@ class StripeIntegrationTestCase(TestCase):
         )
         
         # Create real Stripe product
-        self.stripe_product = stripe.Product.create(
-            name=self.plan.name,
-            description=f"Test plan with {self.plan.initial_credits} initial credits"
+        cls.stripe_product = stripe.Product.create(
+            name=cls.plan.name,
+            description=f"Test plan with {cls.plan.initial_credits} initial credits"
         )
         
         # Create real Stripe price
-        self.stripe_price = stripe.Price.create(
-            product=self.stripe_product.id,
-            unit_amount=self.plan.amount,
-            currency=self.plan.currency,
-            recurring={"interval": self.plan.interval}
+        cls.stripe_price = stripe.Price.create(
+            product=cls.stripe_product.id,
+            unit_amount=cls.plan.amount,
+            currency=cls.plan.currency,
+            recurring={"interval": cls.plan.interval}
         )
         
         # Update plan with actual price ID
-        self.plan.plan_id = self.stripe_price.id
-        self.plan.save()
+        cls.plan.plan_id = cls.stripe_price.id
+        cls.plan.save()
         
         # Create real Stripe customer first
-        self.stripe_customer = stripe.Customer.create(
-            email=self.user.email,
-            name=self.user.username,
-            metadata={"user_id": str(self.user.id)}
+        cls.stripe_customer = stripe.Customer.create(
+            email=cls.user.email,
+            name=cls.user.username,
+            metadata={"user_id": str(cls.user.id), "test_run": cls.run_id}
         )
         
         # Then create customer record in database with the Stripe customer ID
-        self.customer = StripeCustomer.objects.create(
-            user=self.user,
-            customer_id=self.stripe_customer.id,
+        cls.customer = StripeCustomer.objects.create(
+            user=cls.user,
+            customer_id=cls.stripe_customer.id,
             livemode=False
         )
         
         # Set up payment method
-        self.payment_method = self.setup_payment_method()
-        
-        # Set up API client
-        self.client = APIClient()
+        cls.payment_method = cls.setup_payment_method()
+    
+    def setUp(self):
+        """Per-test state: authenticate the client Django built for this test"""
         self.client.force_authenticate(user=self.user)
     
-    def setup_payment_method(self):
-        """Create and attach a payment method to the customer using Stripe's test tokens"""
+    @classmethod
+    def setup_payment_method(cls):
+        """Attach Stripe's permanent test Visa payment method to the customer"""
         try:
-            # Use a predefined test payment method token instead of creating one with card details
-            # This is the recommended approach for testing
-            payment_method = stripe.PaymentMethod.create(
-                type="card",
-                card={
-                    "token": "tok_visa",  # Test token for a Visa card that will succeed
-                },
-            )
-            
-            # Attach the payment method to the customer
-            stripe.PaymentMethod.attach(
-                payment_method.id,
-                customer=self.stripe_customer.id,
+            # Attaching pm_card_visa clones it onto the customer, so no create call is needed
+            payment_method = stripe.PaymentMethod.attach(
+                "pm_card_visa",  # Test payment method for a Visa card that will succeed
+                customer=cls.stripe_customer.id,
             )
             
             # Set as the default payment method
             stripe.Customer.modify(
-                self.stripe_customer.id,
+                cls.stripe_customer.id,
                 invoice_settings={
                     "default_payment_method": payment_method.id,
                 },
@@ -156,60 +204,10 @@ class StripeIntegrationTestCase(TestCase):
             logger.error(f"Error setting up payment method: {e}")
             return None
     
-    def tearDown(self):
-        """Clean up after tests"""
-        # Clean up any Stripe resources created during the test
-        try:
-            if hasattr(self, 'stripe_customer') and self.stripe_customer:
-                # Delete any created subscriptions
-                subscriptions = stripe.Subscription.list(customer=self.stripe_customer.id)
-                for subscription in subscriptions.data:
-                    try:
-                        stripe.Subscription.delete(subscription.id)
-                    except Exception as e:
-                        logger.warning(f"Error deleting subscription: {e}")
-                
-                # Check if customer still exists before trying to delete
-                try:
-                    # Try retrieving the customer first to verify it exists
-                    stripe.Customer.retrieve(self.stripe_customer.id)
-                    # If the above didn't raise an exception, customer exists and we can delete
-                    stripe.Customer.delete(self.stripe_customer.id)
-                except stripe.error.StripeError as e:
-                    # Customer doesn't exist or other error - log but continue
-                    logger.warning(f"Error checking/deleting customer: {e}")
-        except Exception as e:
-            logger.warning(f"Error in subscription cleanup: {e}")
-            
-        try:
-            if hasattr(self, 'stripe_price') and self.stripe_price:
-                # Archive the price in Stripe
-                stripe.Price.modify(self.stripe_price.id, active=False)
-        except Exception as e:
-            logger.warning(f"Error archiving price: {e}")
-            
-        try:
-            if hasattr(self, 'stripe_product') and self.stripe_product:
-                # Archive the product in Stripe
-                stripe.Product.modify(self.stripe_product.id, active=False)
-        except Exception as e:
-            logger.warning(f"Error archiving product: {e}")
-            
-        # Clean up Django database records
-        if hasattr(self, 'customer') and self.customer and self.customer.pk is not None:
-            self.customer.delete()
-        if hasattr(self, 'plan'):
-            self.plan.delete()
-        
-        # Clear cache
-        cache.clear()
-    
     def test_create_checkout_session(self):
         """Test creating a checkout session with raw Stripe API - true E2E test without mocking"""
-        # Use the raw Stripe Python library instead of our custom service layer
-        import stripe
-        stripe.api_key = STRIPE_API_KEY
-        
+        # Use the raw Stripe Python library (configured at module import)
+        # instead of our custom service layer
         # Log the test setup
         logger.info("Starting direct Stripe API checkout session test")
         customer = StripeCustomer.objects.get(user=self.user)
@@ -257,9 +255,6 @@ class StripeIntegrationTestCase(TestCase):
         mock_allocate_credits.return_value = True
         
         # Step 1: Create a subscription directly with Stripe API
-        import stripe
-        stripe.api_key = STRIPE_API_KEY
-        
         subscription = stripe.Subscription.create(
             customer=self.stripe_customer.id,
             items=[{"price": self.plan.plan_id}],
@@ -275,8 +270,8 @@ class StripeIntegrationTestCase(TestCase):
             user=self.user,
             status='active',
             plan_id=self.plan.plan_id,
-            current_period_start=timezone.make_aware(datetime.fromtimestamp(subscription.current_period_start)),
-            current_period_end=timezone.make_aware(datetime.fromtimestamp(subscription.current_period_end)),
+            current_period_start=datetime.fromtimestamp(subscription.current_period_start, tz=dt_timezone.utc),
+            current_period_end=datetime.fromtimestamp(subscription.current_period_end, tz=dt_timezone.utc),
             livemode=False
         )
         
@@ -315,33 +310,6 @@ class StripeIntegrationTestCase(TestCase):
         db_subscription.status = 'canceled'
         db_subscription.save()
 
-    @unittest.mock.patch('apps.stripe_home.views.allocate_subscription_credits')
-    @unittest.mock.patch('apps.stripe_home.credit.allocate_subscription_credits')
-    def test_credit_allocation(self, mock_allocate, mock_view_allocate):
-        """Test that credit allocation works correctly without touching the database"""
-        # Configure both mocks to return True
-        mock_allocate.return_value = True
-        mock_view_allocate.return_value = True
-        
-        # Skip all actual credit allocation and just verify user profile changes work
-        initial_balance = self.user.profile.credits_balance
-        test_credits = 100
-        
-        # Update user profile credits directly through update query
-        # This avoids transaction issues by not calling save() on model instance
-        UserProfile.objects.filter(pk=self.user.profile.pk).update(
-            credits_balance=initial_balance + test_credits
-        )
-        
-        # Refresh the user instance to see the updated credit balance
-        self.user.refresh_from_db()
-        
-        # Verify credits were updated correctly
-        self.assertEqual(self.user.profile.credits_balance, initial_balance + test_credits)
-        
-        # Log test completion
-        logger.info(f"Successfully completed test_credit_allocation with updated approach")
-    
     def test_payment_failure_handling(self):
         """Test handling failed payments with actual Stripe test cards"""
         # Create a payment method that will fail - using Stripe's recommended test tokens
@@ -401,8 +369,7 @@ class StripeIntegrationTestCase(TestCase):
         }
         
         # Make request to create portal session
-        url = reverse('stripe:customer_portal')
-        response = self.client.post(url, portal_data, format='json')
+        response = self.client.post(self.portal_url, portal_data, format='json')
         
         # Verify response
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -417,23 +384,22 @@ class StripeIntegrationTestCase(TestCase):
         # Skip everything related to allocate_subscription_credits
         # Just directly verify we can update a user's credits
         
-        # Get initial balance
-        initial_balance = self.user.profile.credits_balance
+        # Expected balance after the update
         test_amount = 100
+        expected = self.user.profile.credits_balance + test_amount
         
         try:
-            # Update the balance directly using update to avoid any save() or signal logic
-            # that might trigger additional queries
-            from apps.users.models import UserProfile
+            # Increment in the database with a single UPDATE, avoiding save() and
+            # signal logic as well as a read-modify-write race
             UserProfile.objects.filter(pk=self.user.profile.pk).update(
-                credits_balance=initial_balance + test_amount
+                credits_balance=F('credits_balance') + test_amount
             )
             
             # Reload from database
             self.user.refresh_from_db()
             
             # Verify the update worked
-            self.assertEqual(self.user.profile.credits_balance, initial_balance + test_amount, 
+            self.assertEqual(self.user.profile.credits_balance, expected, 
                          "Credit balance was not updated correctly")
                          
             logger.info(f"Successfully tested credit update functionality")
@@ -443,269 +409,137 @@ class StripeIntegrationTestCase(TestCase):
 
 @unittest.skipIf(not USE_REAL_STRIPE_API, "Skipping test that requires a valid Stripe API key")
 @override_settings(DATABASE_ROUTERS=[])  # Disable database routers for tests
-class StripeEdgeCaseTestCase(TestCase):
+class StripeEdgeCaseTestCase(StripeCleanupMixin, TestCase):
     """Test edge cases for Stripe integration with real API"""
     
     # Explicitly specify all databases to ensure test setup creates tables in all of them
     databases = {"default", "local", "supabase"}  # Include all databases that might be accessed
+    # Django builds self.client from this before setUp, so don't build a second one
+    client_class = APIClient
     
-    def setUp(self):
-        """Set up test environment"""
+    @classmethod
+    def setUpTestData(cls):
+        """Set up fixtures once per class; each test runs in a rolled-back savepoint"""
         logger.info("Using multiple databases for tests to prevent routing errors")
-        # Clear cache
-        cache.clear()
-        
-        # Set up API client
-        self.client = APIClient()
+        # Unique names keep parallel workers and shared Stripe test accounts apart
+        cls.run_id = uuid.uuid4().hex[:8]
         
         # Create test user
-        self.user = User.objects.create_user(
-            username='testuser',
-            email='test@example.com',
+        cls.user = User.objects.create_user(
+            username=f'testuser-{cls.run_id}',
+            email=f'test-{cls.run_id}@example.com',
             password='testpassword123'
         )
         
-        # Authenticate
-        self.client.force_authenticate(user=self.user)
-        
         # Create test product
-        self.stripe_product = stripe.Product.create(
+        cls.stripe_product = stripe.Product.create(
             name="Edge Case Test Product",
             description="Product for testing edge cases"
         )
         
         # Create test price
-        self.stripe_price = stripe.Price.create(
-            product=self.stripe_product.id,
+        cls.stripe_price = stripe.Price.create(
+            product=cls.stripe_product.id,
             unit_amount=500,
             currency="usd",
             recurring={"interval": "month"}
         )
         
         # Create customer
-        self.stripe_customer = stripe.Customer.create(
-            email=self.user.email,
-            name=self.user.username,
-            metadata={"user_id": str(self.user.id)}
+        cls.stripe_customer = stripe.Customer.create(
+            email=cls.user.email,
+            name=cls.user.username,
+            metadata={"user_id": str(cls.user.id), "test_run": cls.run_id}
         )
         
         # Create customer record
-        self.customer = StripeCustomer.objects.create(
-            user=self.user,
-            customer_id=self.stripe_customer.id,
+        cls.customer = StripeCustomer.objects.create(
+            user=cls.user,
+            customer_id=cls.stripe_customer.id,
             livemode=False
         )
     
-    def tearDown(self):
-        """Clean up after tests"""
-        # Clean up any Stripe resources created during the test
-        try:
-            if hasattr(self, 'stripe_customer') and self.stripe_customer:
-                # Delete any created subscriptions
-                subscriptions = stripe.Subscription.list(customer=self.stripe_customer.id)
-                for subscription in subscriptions.data:
-                    try:
-                        stripe.Subscription.delete(subscription.id)
-                    except Exception as e:
-                        logger.warning(f"Error deleting subscription: {e}")
-                
-                # Check if customer still exists before trying to delete
-                try:
-                    # Try retrieving the customer first to verify it exists
-                    stripe.Customer.retrieve(self.stripe_customer.id)
-                    # If the above didn't raise an exception, customer exists and we can delete
-                    stripe.Customer.delete(self.stripe_customer.id)
-                except stripe.error.StripeError as e:
-                    # Customer doesn't exist or other error - log but continue
-                    logger.warning(f"Error checking/deleting customer: {e}")
-        except Exception as e:
-            logger.warning(f"Error in subscription cleanup: {e}")
-            
-        try:
-            if hasattr(self, 'stripe_price') and self.stripe_price:
-                # Archive the price in Stripe
-                stripe.Price.modify(self.stripe_price.id, active=False)
-        except Exception as e:
-            logger.warning(f"Error archiving price: {e}")
-            
-        try:
-            if hasattr(self, 'stripe_product') and self.stripe_product:
-                # Archive the product in Stripe
-                stripe.Product.modify(self.stripe_product.id, active=False)
-        except Exception as e:
-            logger.warning(f"Error archiving product: {e}")
-            
-        # Clean up Django database records
-        if hasattr(self, 'customer') and self.customer and self.customer.pk is not None:
-            self.customer.delete()
-        
-        # Clear cache
-        cache.clear()
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Webhook tests post this canned event instead of building one from a live subscription
+        cls._subscription_event_bytes = (FIXTURES_DIR / 'subscription_created_event.json').read_bytes()
+        cls.webhook_url = reverse('stripe:webhook')
+    
+    def setUp(self):
+        """Per-test state: an authenticated client"""
+        # Authenticate the client Django built for this test
+        self.client.force_authenticate(user=self.user)
     
     def test_invalid_webhook_signature(self):
         """Test handling of invalid webhook signatures"""
         if not STRIPE_WEBHOOK_SECRET:
             self.skipTest("Cannot test webhook signatures without STRIPE_WEBHOOK_SECRET")
         
-        # Add a payment method to the customer first
-        payment_method = stripe.PaymentMethod.create(
-            type="card",
-            card={
-                "token": "tok_visa",  # Test token for a Visa card that will succeed
-            },
-        )
-        
-        # Attach the payment method to the customer
-        stripe.PaymentMethod.attach(
-            payment_method.id,
-            customer=self.stripe_customer.id,
-        )
-        
-        # Set as default payment method
-        stripe.Customer.modify(
-            self.stripe_customer.id,
-            invoice_settings={
-                "default_payment_method": payment_method.id,
-            }
-        )
-        
-        # Create a webhook event payload from an actual subscription
-        subscription = stripe.Subscription.create(
-            customer=self.stripe_customer.id,
-            items=[{"price": self.stripe_price.id}]
-        )
-        
-        # Convert to JSON string
-        payload = json.dumps({
-            "id": "evt_test",
-            "object": "event",
-            "type": "customer.subscription.created",
-            "data": {
-                "object": subscription
-            }
-        })
-        
-        # Create an invalid signature
-        timestamp = int(datetime.now().timestamp())
-        invalid_signature = "invalid_signature"
-        
-        # Create request headers
+        # Fixed header whose v1 HMAC can never match; Stripe compares signatures
+        # before the timestamp tolerance, so this exercises the rejection path
         headers = {
-            'HTTP_STRIPE_SIGNATURE': f't={timestamp},v1={invalid_signature}'
+            'HTTP_STRIPE_SIGNATURE': 't=1700000000,v1=deadbeef'
         }
         
         # Make request to webhook endpoint
-        url = reverse('stripe:webhook')
         response = self.client.post(
-            url, 
-            payload, 
+            self.webhook_url, 
+            self._subscription_event_bytes, 
             content_type='application/json',
             **headers
         )
         
         # Verify response (should be 400 Bad Request for invalid signature)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        
-        # Clean up - delete subscription
-        stripe.Subscription.delete(subscription.id)
-    
-    def test_malformed_webhook_payload(self):
-        """Test handling of malformed webhook payloads"""
-        # Create a malformed payload
-        payload = "This is not valid JSON"
-        
-        # Make request to webhook endpoint
-        url = reverse('stripe:webhook')
-        response = self.client.post(url, payload, content_type='application/json')
-        
-        # Verify response (should be 400 Bad Request)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
     def test_missing_customer_in_subscription(self):
         """Test handling of subscription events with missing customer"""
-        # Add a payment method to the customer first
-        payment_method = stripe.PaymentMethod.create(
-            type="card",
-            card={
-                "token": "tok_visa",  # Test token for a Visa card that will succeed
-            },
-        )
+        # The canned event references a customer that has no local StripeCustomer row
+        payload = self._subscription_event_bytes
         
-        # Attach the payment method to the customer
-        stripe.PaymentMethod.attach(
-            payment_method.id,
-            customer=self.stripe_customer.id,
-        )
-        
-        # Set as default payment method
-        stripe.Customer.modify(
-            self.stripe_customer.id,
-            invoice_settings={
-                "default_payment_method": payment_method.id,
-            }
-        )
-        
-        # Create a real subscription
-        subscription = stripe.Subscription.create(
-            customer=self.stripe_customer.id,
-            items=[{"price": self.stripe_price.id}]
-        )
-        
-        # Delete the customer from our database (but not from Stripe)
-        self.customer.delete()
-        
-        # Create webhook payload that doesn't contain the full subscription object
-        # to avoid potential serialization issues
-        payload = json.dumps({
-            "id": "evt_test",
-            "object": "event",
-            "type": "customer.subscription.updated",
-            "data": {
-                "object": {
-                    "id": subscription.id,
-                    "object": "subscription",
-                    "customer": self.stripe_customer.id,
-                    "items": {
-                        "data": [
-                            {"price": {"id": self.stripe_price.id}}
-                        ]
-                    }
-                }
-            }
-        })
-        
-        # For testing, we need to monkey patch the construct_event function to avoid signature verification
-        original_construct_event = stripe.Webhook.construct_event
-        
-        def mock_construct_event(payload, sig_header, secret):
-            return stripe.Event.construct_from(
-                json.loads(payload),
-                stripe.api_key
-            )
-        
-        # Patch the construct_event method
-        stripe.Webhook.construct_event = mock_construct_event
+        # Create headers with any value since we're bypassing verification
+        headers = {
+            'HTTP_STRIPE_SIGNATURE': 'bypass_verification'
+        }
         
-        try:
-            # Create headers with any value since we're bypassing verification
-            headers = {
-                'HTTP_STRIPE_SIGNATURE': 'bypass_verification'
-            }
-            
+        # Skip signature verification for this request only
+        with unittest.mock.patch.object(
+            stripe.Webhook,
+            'construct_event',
+            side_effect=lambda payload, sig_header, secret: stripe.Event.construct_from(
+                json.loads(payload), stripe.api_key
+            ),
+        ):
             # Make request to webhook endpoint
-            url = reverse('stripe:webhook')
             response = self.client.post(
-                url, 
+                self.webhook_url, 
                 payload, 
                 content_type='application/json',
                 **headers
             )
-            
-            # Response should indicate customer not found, but not crash
-            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-        finally:
-            # Restore the original method
-            stripe.Webhook.construct_event = original_construct_event
-        
-        # Clean up - delete subscription
-        stripe.Subscription.delete(subscription.id)
+        
+        # Response should indicate customer not found, but not crash
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StripeWebhookUnitTests(SimpleTestCase):
+    """Webhook request handling that touches neither the database nor Stripe"""
+    
+    client_class = APIClient
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.webhook_url = reverse('stripe:webhook')
+    
+    def test_malformed_webhook_payload(self):
+        """Test handling of malformed webhook payloads"""
+        # Create a malformed payload
+        payload = "This is not valid JSON"
+        
+        # Make request to webhook endpoint
+        response = self.client.post(self.webhook_url, payload, content_type='application/json')
+        
+        # Verify response (should be 400 Bad Request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
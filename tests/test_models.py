@@ -1,69 +1,78 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from apps.stripe_home.models import StripeCustomer, StripeSubscription, StripePlan
+from django.core.cache import cache
+from django.core.management import call_command
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+from apps.stripe_home.credit import get_active_plan
+from apps.stripe_home.models import ProcessedStripeEvent, StripeCustomer, StripeSubscription, StripePlan
 
 User = get_user_model()
 
 class StripeModelTests(TestCase):
-    def setUp(self):
-        # Create test user
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        # Rows are created once per class; each test runs in a rolled-back savepoint
+        # Create test user (needed for the customer and subscription FKs)
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpassword'
         )
         
         # Create test plan
-        self.plan = StripePlan.objects.create(
-            plan_id='price_123456',
-            name='Test Plan',
-            amount=1999,  # $19.99
-            currency='usd',
-            interval='month',
-            initial_credits=100,
-            monthly_credits=50,
-            active=True,
-            livemode=False
-        )
+        [cls.plan] = StripePlan.objects.bulk_create([
+            StripePlan(
+                plan_id='price_123456',
+                name='Test Plan',
+                amount=1999,  # $19.99
+                currency='usd',
+                interval='month',
+                initial_credits=100,
+                monthly_credits=50,
+                active=True,
+                livemode=False
+            )
+        ])
         
         # Create test customer
-        self.customer = StripeCustomer.objects.create(
-            user=self.user,
-            customer_id='cus_123456',
-            livemode=False
-        )
+        [cls.customer] = StripeCustomer.objects.bulk_create([
+            StripeCustomer(
+                user=cls.user,
+                customer_id='cus_123456',
+                livemode=False
+            )
+        ])
         
         # Create test subscription
-        self.subscription = StripeSubscription.objects.create(
-            user=self.user,
-            subscription_id='sub_123456',
-            status='active',
-            plan_id=self.plan.plan_id,
-            current_period_start=timezone.now(),
-            current_period_end=timezone.now() + timezone.timedelta(days=30),
-            cancel_at_period_end=False,
-            livemode=False
-        )
+        now = timezone.now()
+        [cls.subscription] = StripeSubscription.objects.bulk_create([
+            StripeSubscription(
+                user=cls.user,
+                subscription_id='sub_123456',
+                status='active',
+                plan_id=cls.plan.plan_id,
+                current_period_start=now,
+                current_period_end=now + timezone.timedelta(days=30),
+                cancel_at_period_end=False,
+                livemode=False
+            )
+        ])
     
     def test_stripe_customer_model(self):
         """Test StripeCustomer model"""
-        customer = StripeCustomer.objects.get(id=self.customer.id)
+        customer = self.customer
         self.assertEqual(customer.user, self.user)
         self.assertEqual(customer.customer_id, 'cus_123456')
         self.assertEqual(customer.livemode, False)
         self.assertIsNotNone(customer.created_at)
         self.assertIsNotNone(customer.updated_at)
-        
-        # Test dashboard URL method
-        self.assertEqual(
-            customer.get_dashboard_url(),
-            f"https://dashboard.stripe.com/test/customers/{customer.customer_id}"
-        )
     
     def test_stripe_plan_model(self):
         """Test StripePlan model"""
-        plan = StripePlan.objects.get(id=self.plan.id)
+        plan = self.plan
         self.assertEqual(plan.plan_id, 'price_123456')
         self.assertEqual(plan.name, 'Test Plan')
         self.assertEqual(plan.amount, 1999)
@@ -76,7 +85,7 @@ class StripeModelTests(TestCase):
     
     def test_stripe_subscription_model(self):
         """Test StripeSubscription model"""
-        subscription = StripeSubscription.objects.get(id=self.subscription.id)
+        subscription = self.subscription
         self.assertEqual(subscription.user, self.user)
         self.assertEqual(subscription.subscription_id, 'sub_123456')
         self.assertEqual(subscription.status, 'active')
@@ -85,3 +94,144 @@ class StripeModelTests(TestCase):
         self.assertIsNotNone(subscription.current_period_end)
         self.assertEqual(subscription.cancel_at_period_end, False)
         self.assertEqual(subscription.livemode, False)
+
+
+class StripeModelUnitTests(SimpleTestCase):
+    """Model behaviour that needs no database rows"""
+    
+    def test_stripe_customer_dashboard_url(self):
+        """Test StripeCustomer.get_dashboard_url on an unsaved instance"""
+        customer = StripeCustomer(customer_id='cus_123456', livemode=False)
+        self.assertEqual(
+            customer.get_dashboard_url(),
+            f"https://dashboard.stripe.com/test/customers/{customer.customer_id}"
+        )
+
+
+@override_settings(STRIPE_CREATE_CUSTOMER_ON_SIGNUP=True)
+class StripeCustomerSignupSignalTests(TestCase):
+    """The opt-in signal that creates a Stripe customer when a user signs up"""
+    
+    @patch('stripe.Customer.create', return_value=SimpleNamespace(id='cus_signup'))
+    def test_customer_created_after_signup_commits(self, mock_customer_create):
+        """Test the customer is created once the signup transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user = User.objects.create_user(
+                username='signupuser',
+                email='signup@example.com',
+                password='testpassword'
+            )
+            # Nothing reaches Stripe until the signup commits
+            mock_customer_create.assert_not_called()
+        
+        self.assertEqual(len(callbacks), 1)
+        mock_customer_create.assert_called_once()
+        self.assertEqual(mock_customer_create.call_args.kwargs['idempotency_key'], f"cust:{user.id}")
+        self.assertEqual(StripeCustomer.objects.get(user=user).customer_id, 'cus_signup')
+    
+    @patch('stripe.Customer.create', return_value=SimpleNamespace(id='cus_signup'))
+    def test_existing_customer_is_not_recreated(self, mock_customer_create):
+        """Test a user who already has a customer record is left alone"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = User.objects.create_user(
+                username='signupuser',
+                email='signup@example.com',
+                password='testpassword'
+            )
+        StripeCustomer.objects.create(user=user, customer_id='cus_existing', livemode=False)
+        for callback in callbacks:
+            callback()
+        
+        mock_customer_create.assert_not_called()
+        self.assertEqual(StripeCustomer.objects.get(user=user).customer_id, 'cus_existing')
+
+
+class PruneStripeEventsCommandTests(TestCase):
+    """The prune_stripe_events management command"""
+    
+    def test_only_events_past_the_retry_window_are_deleted(self):
+        """Test rows older than the retention window go and recent ones stay"""
+        ProcessedStripeEvent.objects.bulk_create([
+            ProcessedStripeEvent(event_id='evt_old'),
+            ProcessedStripeEvent(event_id='evt_recent'),
+        ])
+        # processed_at is auto_now_add, so age the old row with an UPDATE
+        ProcessedStripeEvent.objects.filter(event_id='evt_old').update(
+            processed_at=timezone.now() - timezone.timedelta(days=4)
+        )
+        
+        out = StringIO()
+        call_command('prune_stripe_events', stdout=out)
+        
+        self.assertEqual(list(ProcessedStripeEvent.objects.values_list('event_id', flat=True)), ['evt_recent'])
+        self.assertIn('Deleted 1', out.getvalue())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'stripe-plan-cache-tests'}})
+class StripePlanCacheTests(TestCase):
+    """The checkout plan cache and the StripePlan writes that evict it"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = StripePlan.objects.create(
+            plan_id='price_cached',
+            name='Cached Plan',
+            amount=1999,
+            currency='usd',
+            interval='month',
+            livemode=False
+        )
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_cache_hit_skips_the_database(self):
+        """Test a second lookup is served from the cache as a plain dict"""
+        first = get_active_plan('plan_id', 'price_cached')
+        with self.assertNumQueries(0):
+            second = get_active_plan('plan_id', 'price_cached')
+        
+        self.assertEqual(second, {'id': self.plan.id, 'plan_id': 'price_cached', 'name': 'Cached Plan'})
+        self.assertEqual(first, second)
+    
+    def test_save_evicts_both_lookup_keys(self):
+        """Test a renamed plan is reloaded by id and by plan_id"""
+        get_active_plan('id', self.plan.id)
+        get_active_plan('plan_id', 'price_cached')
+        
+        self.plan.name = 'Renamed Plan'
+        self.plan.save()
+        
+        self.assertEqual(get_active_plan('id', self.plan.id)['name'], 'Renamed Plan')
+        self.assertEqual(get_active_plan('plan_id', 'price_cached')['name'], 'Renamed Plan')
+    
+    def test_plan_id_change_evicts_the_old_key(self):
+        """Test the entry under the previous plan_id is dropped"""
+        get_active_plan('plan_id', 'price_cached')
+        
+        self.plan.plan_id = 'price_renumbered'
+        self.plan.save()
+        
+        with self.assertRaises(StripePlan.DoesNotExist):
+            get_active_plan('plan_id', 'price_cached')
+    
+    def test_delete_evicts_the_plan(self):
+        """Test a deleted plan is no longer served"""
+        get_active_plan('plan_id', 'price_cached')
+        
+        self.plan.delete()
+        
+        with self.assertRaises(StripePlan.DoesNotExist):
+            get_active_plan('plan_id', 'price_cached')
+    
+    def test_queryset_deactivation_evicts_the_plan(self):
+        """Test update(active=False) evicts even though no save signal is sent"""
+        get_active_plan('id', self.plan.id)
+        get_active_plan('plan_id', 'price_cached')
+        
+        StripePlan.objects.filter(pk=self.plan.pk).update(active=False)
+        
+        with self.assertRaises(StripePlan.DoesNotExist):
+            get_active_plan('id', self.plan.id)
+        with self.assertRaises(StripePlan.DoesNotExist):
+            get_active_plan('plan_id', 'price_cached')
@@ -1,9 +1,9 @@
+import asyncio
 import json
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.core.cache import cache
 import os
 import stripe
 import hmac
@@ -11,12 +11,20 @@ import hashlib
 import time
 from django.utils import timezone
 import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from apps.stripe_home.config import get_stripe_client
-from apps.stripe_home.models import StripeCustomer, StripePlan, StripeSubscription
+from apps.stripe_home.models import (
+    ProcessedStripeEvent,
+    StripeCustomer,
+    StripePlan,
+    StripeSubscription,
+)
+from apps.stripe_home.views import StripeWebhookView
 
 User = get_user_model()
 
@@ -29,8 +37,72 @@ STRIPE_API_KEY = (
     if getattr(settings, "TESTING", False)
     else settings.STRIPE_SECRET_KEY
 )
+# Configure the stripe module once for direct stripe.* calls in these tests
+stripe.api_key = STRIPE_API_KEY
 
 
+# Static webhook bodies, serialized once. construct_event is patched wherever a
+# signature would be checked, so the period timestamps never need to be current
+_UNSIGNED_EVENT_PAYLOAD = json.dumps(
+    {
+        "id": "evt_test",
+        "object": "event",
+        "type": "customer.subscription.created",
+    }
+).encode("utf-8")
+
+_SUBSCRIPTION_EVENT_PAYLOAD = json.dumps(
+    {
+        "id": "evt_test_webhook",
+        "object": "event",
+        "api_version": "2020-08-27",
+        "created": 1700000000,
+        "data": {
+            "object": {
+                "id": "sub_test_webhook",
+                "object": "subscription",
+                "customer": "cus_test_webhook",
+                "status": "active",
+                "items": {"data": [{"price": {"id": "price_test_webhook"}}]},
+                "current_period_start": 1699913600,
+                "current_period_end": 1700086400,
+                "cancel_at_period_end": False,
+                "livemode": False,
+            }
+        },
+        "type": "customer.subscription.created",
+    }
+).encode("utf-8")
+
+
+def _build_mock_subscription_event(event_id, subscription_id, customer_id, plan_id):
+    """Build a customer.subscription.created event shaped like what Stripe sends
+
+    Only attribute access is needed, so plain namespaces stand in for the
+    StripeObjects instead of MagicMocks.
+    """
+    now = int(time.time())
+    subscription = SimpleNamespace(
+        id=subscription_id,
+        customer=customer_id,
+        status="active",
+        current_period_start=now - 86400,  # Unix timestamp for yesterday
+        current_period_end=now + 86400,  # Unix timestamp for tomorrow
+        cancel_at_period_end=False,
+        livemode=False,
+        # The items.data[0].price.id structure
+        items=SimpleNamespace(data=[SimpleNamespace(price=SimpleNamespace(id=plan_id))]),
+    )
+    return SimpleNamespace(
+        id=event_id,
+        type="customer.subscription.created",
+        data=SimpleNamespace(object=subscription),
+    )
+
+
+@override_settings(TEST_MODE=True)
+# Nothing is ever stored, so throttle state cannot build up and no clear is needed
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
 @override_settings(
     # Disable throttling for tests
     REST_FRAMEWORK={
@@ -43,85 +115,92 @@ STRIPE_API_KEY = (
     }
 )
 class CheckoutSessionViewTest(TestCase):
-    """Test creating checkout sessions with real Stripe API in test mode"""
-
-    def setUp(self):
-        # Set test mode
-        from django.conf import settings
+    """Test creating checkout sessions with the Stripe HTTP boundary mocked out"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpClass(cls):
+        # Offline Stripe objects shaped like the API responses; the view under
+        # test only needs their IDs, so no network round-trip is made
+        cls.test_product = stripe.Product.construct_from(
+            {
+                "id": "prod_test_checkout",
+                "object": "product",
+                "name": "Test Plan",
+                "description": "Test plan for view tests",
+                "metadata": {"initial_credits": "100", "monthly_credits": "50"},
+            },
+            STRIPE_API_KEY,
+        )
 
-        settings.TEST_MODE = True
+        cls.test_price = stripe.Price.construct_from(
+            {
+                "id": "price_test_checkout",
+                "object": "price",
+                "product": cls.test_product.id,
+                "unit_amount": 1500,  # $15.00
+                "currency": "usd",
+                "recurring": {"interval": "month"},
+            },
+            STRIPE_API_KEY,
+        )
 
-        # Clear cache to avoid throttling issues
-        cache.clear()
+        cls.test_customer = stripe.Customer.construct_from(
+            {
+                "id": "cus_test_checkout",
+                "object": "customer",
+                "email": "test@example.com",
+                "name": "testuser",
+            },
+            STRIPE_API_KEY,
+        )
 
-        # Set up Stripe client and configure API key for direct stripe module calls
-        self.stripe_client = get_stripe_client()
-        stripe.api_key = STRIPE_API_KEY
+        super().setUpClass()
 
+    @classmethod
+    def setUpTestData(cls):
         # Create test user
-        self.user = User.objects.create_user(
+        cls.user = User.objects.create_user(
             username="testuser", email="test@example.com", password="testpassword"
         )
 
-        # Create API client and authenticate
-        self.client = APIClient()
-        self.client.force_authenticate(user=self.user)
-
-        # Create a test product and price in Stripe
-        self.test_product = stripe.Product.create(
-            name="Test Plan",
-            description="Test plan for view tests",
-            metadata={"initial_credits": "100", "monthly_credits": "50"},
-        )
-
-        self.test_price = stripe.Price.create(
-            product=self.test_product.id,
-            unit_amount=1500,  # $15.00
-            currency="usd",
-            recurring={"interval": "month"},
-        )
-
         # Create a test plan in the database
-        self.test_plan = StripePlan.objects.create(
-            plan_id=self.test_price.id,
-            name=self.test_product.name,
-            amount=self.test_price.unit_amount,
-            currency=self.test_price.currency,
+        cls.test_plan = StripePlan.objects.create(
+            plan_id=cls.test_price.id,
+            name=cls.test_product.name,
+            amount=cls.test_price.unit_amount,
+            currency=cls.test_price.currency,
             interval="month",
             initial_credits=100,
             monthly_credits=50,
             livemode=False,
         )
 
-        # Create a customer in Stripe
-        self.test_customer = stripe.Customer.create(
-            email=self.user.email,
-            name=self.user.username,
-            metadata={"user_id": str(self.user.id)},
-        )
-
         # Save customer in database
-        self.customer = StripeCustomer.objects.create(
-            user=self.user, customer_id=self.test_customer.id
+        cls.customer = StripeCustomer.objects.create(
+            user=cls.user, customer_id=cls.test_customer.id
         )
 
+    def setUp(self):
+        # Authenticate the API client Django built for this test
+        self.client.force_authenticate(user=self.user)
+
         # URL for programmable checkout endpoint
         self.url = reverse("stripe:programmable_checkout")
 
-    def tearDown(self):
-        # Clean up Stripe resources
-        try:
-            # Can't delete products with prices, need to update instead
-            stripe.Product.modify(self.test_product.id, active=False)
-        except Exception as e:
-            print(f"Error cleaning up test product: {str(e)}")
-
-        # Clean up database objects
-        self.test_plan.delete()
-        self.customer.delete()
-
-    def test_create_checkout_session_success(self):
+    @patch("stripe.checkout.Session.create")
+    def test_create_checkout_session_success(self, mock_session_create):
         """Test successful creation of a checkout session"""
+        mock_session_create.return_value = stripe.checkout.Session.construct_from(
+            {
+                "id": "cs_test_checkout",
+                "object": "checkout.session",
+                "url": "https://checkout.stripe.com/c/pay/cs_test_checkout",
+            },
+            STRIPE_API_KEY,
+        )
+
         # Request data
         data = {
             "plan_id": self.test_price.id,
@@ -134,43 +213,122 @@ class CheckoutSessionViewTest(TestCase):
 
         # Check response
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn("sessionId", response.data)
+        self.assertEqual(response.data["sessionId"], "cs_test_checkout")
         self.assertIn("url", response.data)
 
-        # Verify the session exists in Stripe
-        session_id = response.data["sessionId"]
-        session = stripe.checkout.Session.retrieve(session_id)
+        # Verify the session Stripe would have been asked to create
+        mock_session_create.assert_called_once()
+        session_kwargs = mock_session_create.call_args.kwargs
+        self.assertEqual(session_kwargs["customer"], self.test_customer.id)
+        self.assertEqual(session_kwargs["mode"], "subscription")
+        self.assertEqual(session_kwargs["client_reference_id"], str(self.user.id))
+        self.assertEqual(session_kwargs["line_items"][0]["price"], self.test_price.id)
+        self.assertIn("idempotency_key", session_kwargs)
+
+    @patch("stripe.checkout.Session.create")
+    def test_create_embedded_checkout_session(self, mock_session_create):
+        """Test embedded checkout sends return_url instead of success/cancel URLs"""
+        mock_session_create.return_value = stripe.checkout.Session.construct_from(
+            {
+                "id": "cs_test_embedded",
+                "object": "checkout.session",
+                "url": None,
+                "client_secret": "cs_test_embedded_secret",
+            },
+            STRIPE_API_KEY,
+        )
 
-        self.assertEqual(session.payment_method_types[0], "card")
-        self.assertEqual(session.mode, "subscription")
-        self.assertEqual(session.client_reference_id, str(self.user.id))
+        data = {
+            "plan_id": self.test_price.id,
+            "ui_mode": "embedded",
+            "return_url": "https://example.com/return?session_id={CHECKOUT_SESSION_ID}",
+        }
 
+        response = self.client.post(self.url, data, format="json")
 
-class StripeWebhookViewTest(TestCase):
-    """Test handling webhook events from Stripe"""
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["clientSecret"], "cs_test_embedded_secret")
+
+        mock_session_create.assert_called_once()
+        session_kwargs = mock_session_create.call_args.kwargs
+        self.assertEqual(session_kwargs["ui_mode"], "embedded")
+        self.assertEqual(session_kwargs["return_url"], data["return_url"])
+        self.assertNotIn("success_url", session_kwargs)
+        self.assertNotIn("cancel_url", session_kwargs)
+
+    @patch("stripe.checkout.Session.create")
+    def test_invalid_checkout_requests_are_rejected(self, mock_session_create):
+        """Test invalid requests get a 400 string error before Stripe is called"""
+        urls = {
+            "success_url": "https://example.com/success",
+            "cancel_url": "https://example.com/cancel",
+        }
+        cases = [
+            ({"mode": "subscription"}, "plan_id is required for subscription mode"),
+            ({"mode": "payment"}, "amount is required for payment mode"),
+            ({"mode": "bogus"}, 'mode: "bogus" is not a valid choice.'),
+        ]
+        for data, error in cases:
+            with self.subTest(data=data):
+                mock_session_create.reset_mock()
+
+                response = self.client.post(self.url, {**urls, **data}, format="json")
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.data["error"], error)
+                mock_session_create.assert_not_called()
+
+    @patch("stripe.checkout.Session.create")
+    def test_payment_amount_is_converted_to_cents(self, mock_session_create):
+        """Test a decimal payment amount reaches Stripe in the smallest currency unit"""
+        mock_session_create.return_value = stripe.checkout.Session.construct_from(
+            {
+                "id": "cs_test_payment",
+                "object": "checkout.session",
+                "url": "https://checkout.stripe.com/c/pay/cs_test_payment",
+            },
+            STRIPE_API_KEY,
+        )
 
-    def setUp(self):
-        # Set test mode
-        from django.conf import settings
+        data = {
+            "mode": "payment",
+            "amount": "19.99",
+            "currency": "EUR",
+            "billing_address_collection": "auto",
+            "success_url": "https://example.com/success",
+            "cancel_url": "https://example.com/cancel",
+        }
+
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_session_create.assert_called_once()
+        session_kwargs = mock_session_create.call_args.kwargs
+        price_data = session_kwargs["line_items"][0]["price_data"]
+        self.assertEqual(price_data["unit_amount"], 1999)
+        self.assertEqual(price_data["currency"], "eur")
+        self.assertEqual(session_kwargs["billing_address_collection"], "auto")
 
-        settings.TEST_MODE = True
 
-        # Set up Stripe client and configure API key for direct stripe module calls
-        self.stripe_client = get_stripe_client()
-        stripe.api_key = STRIPE_API_KEY
+@override_settings(TEST_MODE=True)
+class StripeWebhookViewTest(TestCase):
+    """Test handling webhook events from Stripe"""
 
+    @classmethod
+    def setUpTestData(cls):
+        # Rows are created once per class; each test runs in a rolled-back savepoint
         # Create test user
-        self.user = User.objects.create_user(
+        cls.user = User.objects.create_user(
             username="webhookuser", email="webhook@example.com", password="testpassword"
         )
 
         # Create Stripe customer
-        self.stripe_customer = StripeCustomer.objects.create(
-            user=self.user, customer_id="cus_test_webhook", livemode=False
+        cls.stripe_customer = StripeCustomer.objects.create(
+            user=cls.user, customer_id="cus_test_webhook", livemode=False
         )
 
         # Create a test plan
-        self.test_plan = StripePlan.objects.create(
+        cls.test_plan = StripePlan.objects.create(
             plan_id="price_test_webhook",
             name="Webhook Test Plan",
             amount=2000,
@@ -181,98 +339,51 @@ class StripeWebhookViewTest(TestCase):
             livemode=False,
         )
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Nothing here changes per test, so set it up once for the class
+        # Set up Stripe client
+        cls.stripe_client = get_stripe_client()
+
         # URL for webhook endpoint
-        self.url = reverse("stripe:webhook")
+        cls.url = reverse("stripe:webhook")
 
-    def test_webhook_without_signature(self):
+    async def test_webhook_without_signature(self):
         """Test webhook endpoint called without Stripe signature"""
-        # Create dummy event data
-        event_data = {
-            "id": "evt_test",
-            "object": "event",
-            "type": "customer.subscription.created",
-        }
-
-        # Make request without signature
-        response = self.client.post(
-            self.url, data=json.dumps(event_data), content_type="application/json"
+        # Independent unsigned variants; they are rejected before any DB access,
+        # so replay them concurrently through Django's async test client
+        payloads = [_UNSIGNED_EVENT_PAYLOAD, b"{}", b""]
+        responses = await asyncio.gather(
+            *(
+                self.async_client.post(
+                    self.url, data=payload, content_type="application/json"
+                )
+                for payload in payloads
+            )
         )
 
         # Should return 400 Bad Request
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for payload, response in zip(payloads, responses):
+            with self.subTest(payload=payload):
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_webhook_with_known_event_type(self):
         """Test webhook with a known event type that we handle"""
-        # Create a valid subscription object similar to what Stripe would send
-        subscription_data = {
-            "id": "sub_test_webhook",
-            "object": "subscription",
-            "customer": self.stripe_customer.customer_id,
-            "status": "active",
-            "items": {"data": [{"price": {"id": self.test_plan.plan_id}}]},
-            "current_period_start": int(time.time()) - 86400,  # Yesterday
-            "current_period_end": int(time.time()) + 86400,  # Tomorrow
-            "cancel_at_period_end": False,
-            "livemode": False,
-        }
-
-        # Create the event with known type
-        event_data = {
-            "id": "evt_test_webhook",
-            "object": "event",
-            "api_version": "2020-08-27",
-            "created": int(time.time()),
-            "data": {"object": subscription_data},
-            "type": "customer.subscription.created",
-        }
-
-        # Mock stripe.Webhook.construct_event to bypass signature verification
-        from unittest.mock import patch, MagicMock
-
-        # Create a proper mock event structure that matches what Stripe sends
-        # and what our handler expects
-        mock_event = MagicMock()
-        mock_event.type = "customer.subscription.created"
-        mock_event.id = "evt_test_webhook"
-
-        # Set up the data.object structure to match a Stripe subscription
-        mock_subscription = MagicMock()
-        mock_subscription.id = "sub_test_webhook"
-        mock_subscription.customer = self.stripe_customer.customer_id
-        mock_subscription.status = "active"
-        mock_subscription.current_period_start = (
-            int(time.time()) - 86400
-        )  # Unix timestamp for yesterday
-        mock_subscription.current_period_end = (
-            int(time.time()) + 86400
-        )  # Unix timestamp for tomorrow
-        mock_subscription.cancel_at_period_end = False
-        mock_subscription.livemode = False
-
-        # Create the items.data[0].price.id structure
-        mock_price = MagicMock()
-        mock_price.id = self.test_plan.plan_id
-
-        mock_item = MagicMock()
-        mock_item.price = mock_price
-
-        mock_items = MagicMock()
-        mock_items.data = [mock_item]
-
-        mock_subscription.items = mock_items
-
-        # Attach the mock subscription to the event
-        mock_event.data.object = mock_subscription
-
-        # Payload with proper format for the webhook
-        payload = json.dumps(event_data)
+        # Event object our handler reads instead of a signature-verified one
+        mock_event = _build_mock_subscription_event(
+            "evt_test_webhook",
+            "sub_test_webhook",
+            self.stripe_customer.customer_id,
+            self.test_plan.plan_id,
+        )
 
         # Use patch to mock the Stripe webhook construct_event method
         with patch("stripe.Webhook.construct_event", return_value=mock_event):
             # Send webhook with a dummy signature
             response = self.client.post(
                 self.url,
-                data=payload,
+                data=_SUBSCRIPTION_EVENT_PAYLOAD,
                 content_type="application/json",
                 HTTP_STRIPE_SIGNATURE="t=123456,v1=dummy_signature",
             )
@@ -286,3 +397,189 @@ class StripeWebhookViewTest(TestCase):
                     subscription_id="sub_test_webhook"
                 ).exists()
             )
+
+    def test_duplicate_webhook_event_is_not_reprocessed(self):
+        """Test that a redelivered event ID is acknowledged without being handled again"""
+        # The view only reads id, type and data.object.id from the event
+        mock_event = SimpleNamespace(
+            id=f"evt_test_duplicate_{time.time_ns()}",
+            type="customer.updated",
+            data=SimpleNamespace(
+                object=SimpleNamespace(id=self.stripe_customer.customer_id)
+            ),
+        )
+
+        with patch("stripe.Webhook.construct_event", return_value=mock_event):
+            first = self.client.post(
+                self.url,
+                data="{}",
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=123456,v1=dummy_signature",
+            )
+            second = self.client.post(
+                self.url,
+                data="{}",
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=123456,v1=dummy_signature",
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json()["status"], "success")
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json()["status"], "duplicate")
+
+    def test_failed_webhook_event_is_processed_on_retry(self):
+        """Test that a handler error rolls back the claim so Stripe's retry runs again"""
+        mock_event = SimpleNamespace(
+            id=f"evt_test_retry_{time.time_ns()}",
+            type="customer.updated",
+            data=SimpleNamespace(
+                object=SimpleNamespace(id=self.stripe_customer.customer_id)
+            ),
+        )
+
+        with patch("stripe.Webhook.construct_event", return_value=mock_event), patch.object(
+            StripeWebhookView,
+            "_handle_customer_updated",
+            side_effect=[RuntimeError("handler failed"), None],
+        ) as mock_handler:
+            first = self.client.post(
+                self.url,
+                data="{}",
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=123456,v1=dummy_signature",
+            )
+            # The failed attempt must not leave its claim behind
+            self.assertFalse(
+                ProcessedStripeEvent.objects.filter(event_id=mock_event.id).exists()
+            )
+            retry = self.client.post(
+                self.url,
+                data="{}",
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=123456,v1=dummy_signature",
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.json()["status"], "success")
+        self.assertEqual(mock_handler.call_count, 2)
+        self.assertTrue(
+            ProcessedStripeEvent.objects.filter(event_id=mock_event.id).exists()
+        )
+
+
+class ProductManagementViewTest(TestCase):
+    """Test listing products with the Stripe client mocked out"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="productuser", email="product@example.com", password="testpassword"
+        )
+        cls.local_plan = StripePlan.objects.create(
+            plan_id="price_listing_monthly",
+            name="Listing Plan",
+            amount=1000,
+            currency="usd",
+            interval="month",
+            initial_credits=100,
+            monthly_credits=50,
+            livemode=False,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("stripe:product_management")
+
+        # Offline listings; prices reference their product by ID as Stripe returns them
+        self.products = [
+            stripe.Product.construct_from(
+                {"id": "prod_listing_priced", "object": "product", "name": "Priced", "active": True},
+                STRIPE_API_KEY,
+            ),
+            stripe.Product.construct_from(
+                {"id": "prod_listing_unpriced", "object": "product", "name": "Unpriced", "active": True},
+                STRIPE_API_KEY,
+            ),
+        ]
+        self.prices = [
+            stripe.Price.construct_from(
+                {
+                    "id": "price_listing_monthly",
+                    "object": "price",
+                    "product": "prod_listing_priced",
+                    "unit_amount": 1000,
+                    "currency": "usd",
+                    "recurring": {"interval": "month"},
+                },
+                STRIPE_API_KEY,
+            ),
+            stripe.Price.construct_from(
+                {
+                    "id": "price_listing_once",
+                    "object": "price",
+                    "product": "prod_listing_priced",
+                    "unit_amount": 5000,
+                    "currency": "usd",
+                    "recurring": None,
+                },
+                STRIPE_API_KEY,
+            ),
+        ]
+
+        self.stripe_client = MagicMock()
+        self.stripe_client.products.list.return_value.auto_paging_iter.return_value = self.products
+        self.stripe_client.prices.list.return_value.auto_paging_iter.return_value = self.prices
+        patcher = patch(
+            "apps.stripe_home.views.get_stripe_client", return_value=self.stripe_client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_products_are_grouped_with_their_prices(self):
+        """Test every product is listed, with price product IDs and local plans"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        listing = {entry["product"]["id"]: entry for entry in response.json()}
+        self.assertEqual(set(listing), {"prod_listing_priced", "prod_listing_unpriced"})
+
+        priced = listing["prod_listing_priced"]
+        self.assertEqual(
+            [price["id"] for price in priced["prices"]],
+            ["price_listing_monthly", "price_listing_once"],
+        )
+        for price in priced["prices"]:
+            self.assertEqual(price["product"], "prod_listing_priced")
+        self.assertEqual(
+            priced["local_plans"],
+            [
+                {
+                    "id": self.local_plan.id,
+                    "initial_credits": 100,
+                    "monthly_credits": 50,
+                    "active": True,
+                }
+            ],
+        )
+
+        # Products without prices are still listed
+        self.assertEqual(listing["prod_listing_unpriced"]["prices"], [])
+        self.assertEqual(listing["prod_listing_unpriced"]["local_plans"], [])
+
+    def test_active_filter(self):
+        """Test active products are requested by default and active=false lists all"""
+        for query, expected_params in [
+            ({}, {"limit": 100, "active": True}),
+            ({"active": "false"}, {"limit": 100}),
+        ]:
+            with self.subTest(query=query):
+                self.stripe_client.products.list.reset_mock()
+
+                response = self.client.get(self.url, query)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.stripe_client.products.list.assert_called_once_with(params=expected_params)
@@ -1,25 +1,128 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from rest_framework.settings import api_settings
 import stripe
 import logging
-from types import SimpleNamespace
-import datetime
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timezone as dt_timezone
 
-from .models import StripeCustomer, StripeSubscription, StripePlan
-from .config import get_stripe_client
-from .credit import allocate_subscription_credits, handle_subscription_change, map_plan_to_subscription_tier
+from .models import ProcessedStripeEvent, StripeCustomer, StripeSubscription, StripePlan
+from .config import StripeConfig, get_stripe_client
+from .serializers import ProgrammableCheckoutSerializer
+from .customers import get_or_create_customer_id
+from .credit import allocate_subscription_credits, evict_plans, get_active_plan, get_plans_by_id, handle_subscription_change, map_plan_to_subscription_tier, set_subscription_tier
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Bound once; subscription webhooks convert several Stripe timestamps each
+_UTC = dt_timezone.utc
+_fromtimestamp = datetime.fromtimestamp
+
+# How long a Stripe price's active flag is cached; price webhooks evict it
+STRIPE_PRICE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Window in which repeated identical checkout session creates reuse Stripe's first response
+IDEMPOTENCY_WINDOW_SECONDS = 60
+
+# How long a user's dashboard payload is cached; subscription webhooks bump its version
+DASHBOARD_CACHE_TIMEOUT = 30
+
 class CustomerNotFoundException(Exception):
     pass
 
+
+def is_duplicate_event(event_id):
+    """Claim a webhook event ID, returning True if it was already claimed
+    
+    Call it inside the transaction that applies the event, so the claim is
+    only committed together with the event's writes.
+    """
+    # One indexed INSERT; the primary key makes a concurrent redelivery wait
+    # for this transaction and then find the committed row
+    return not ProcessedStripeEvent.objects.get_or_create(event_id=event_id)[1]
+
+
+@lru_cache(maxsize=4)
+def _default_checkout_urls(base_url):
+    """Build the default checkout redirect URLs once per BASE_URL"""
+    return (
+        f"{base_url}/subscription/success?session_id={{CHECKOUT_SESSION_ID}}",
+        f"{base_url}/subscription/cancel",
+    )
+
+
+def _idempotency_key(operation, params):
+    """Derive a Stripe idempotency key from an operation's parameters
+    
+    Identical requests inside the same window, such as a double-clicked
+    Subscribe button, get Stripe's saved response instead of a new object.
+    """
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{operation}:{digest}:{int(time.time()) // IDEMPOTENCY_WINDOW_SECONDS}"
+
+
+def _error_message(errors):
+    """Flatten serializer errors into the single message string clients read"""
+    parts = []
+    for field, detail in errors.items():
+        if isinstance(detail, dict):
+            # Nested fields (list/dict children) report their errors by key
+            detail = [_error_message(detail)]
+        text = ' '.join(str(message) for message in detail)
+        parts.append(text if field == api_settings.NON_FIELD_ERRORS_KEY else f"{field}: {text}")
+    return '; '.join(parts)
+
+
+def _price_cache_key(price_id):
+    return f"stripe:price:{price_id}"
+
+
+def is_price_active(price_id):
+    """Check whether a Stripe price is active, caching the answer"""
+    key = _price_cache_key(price_id)
+    active = cache.get(key)
+    if active is None:
+        active = stripe.Price.retrieve(price_id).active
+        cache.set(key, active, timeout=STRIPE_PRICE_CACHE_TIMEOUT)
+    return active
+
+
+def _dashboard_version_key(user_id):
+    return f"stripe:dashboard_version:{user_id}"
+
+
+def _dashboard_cache_key(user_id):
+    """Build the cache key for a user's dashboard payload at its current version"""
+    version = cache.get(_dashboard_version_key(user_id), 0)
+    return f"stripe:dashboard:{user_id}:v{version}"
+
+
+def invalidate_dashboard(user_id):
+    """Bump a user's dashboard version so any cached payload is skipped
+    
+    A dashboard request already in flight stores its payload under the old
+    version, so it can never be served after the bump.
+    """
+    key = _dashboard_version_key(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Backends that store nothing, such as the dummy cache, cannot count
+        pass
+
 class CheckoutSessionView(APIView):
     """Generate Stripe Checkout Sessions for subscription plans"""
     permission_classes = [IsAuthenticated]
@@ -30,7 +133,7 @@ class CheckoutSessionView(APIView):
             return Response({'error': 'Plan ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            plan = StripePlan.objects.get(id=plan_id, active=True)
+            plan = get_active_plan('id', plan_id)
             user = request.user
             
             # Extract success and cancel URLs from request if provided
@@ -57,67 +160,40 @@ class CheckoutSessionView(APIView):
     
     def _create_checkout_session(self, plan, user, success_url=None, cancel_url=None, customer_id=None):
         """Create a Stripe Checkout Session"""
-        # Use provided customer_id or get/create one
-        if customer_id:
-            # If customer_id is provided (e.g. for testing), use it directly
-            customer_obj = StripeCustomer.objects.get(customer_id=customer_id)
-            created = False
-            customer = SimpleNamespace(customer_id=customer_id)  # Simple object with customer_id attribute
-        else:
-            # Get or create customer if needed
-            customer_obj, created = StripeCustomer.objects.get_or_create(
-                user=user,
-                defaults={
-                    'customer_id': self._create_stripe_customer(user),
-                    'livemode': not settings.STRIPE_SECRET_KEY.startswith('sk_test_')
-                }
-            )
-            customer = SimpleNamespace(customer_id=customer_obj.customer_id)
+        # Use a provided customer_id (e.g. for testing) as is, since Stripe
+        # rejects IDs that do not exist; otherwise get/create one
+        if not customer_id:
+            customer_id = get_or_create_customer_id(user)
         
         # Default success and cancel URLs
-        default_success_url = f"{getattr(settings, 'BASE_URL', 'https://example.com')}/subscription/success?session_id={{CHECKOUT_SESSION_ID}}"
-        default_cancel_url = f"{getattr(settings, 'BASE_URL', 'https://example.com')}/subscription/cancel"
+        default_success_url, default_cancel_url = _default_checkout_urls(getattr(settings, 'BASE_URL', 'https://example.com'))
         
         # Create checkout session
-        stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-        checkout_session = stripe.checkout.Session.create(
-            customer=customer.customer_id,
-            line_items=[{
-                'price': plan.plan_id,
+        session_params = {
+            'customer': customer_id,
+            'line_items': [{
+                'price': plan['plan_id'],
                 'quantity': 1,
             }],
-            mode='subscription',
-            success_url=success_url or default_success_url,
-            cancel_url=cancel_url or default_cancel_url,
-            allow_promotion_codes=True,
-            billing_address_collection='required',
-            customer_email=user.email if not customer.customer_id else None,
-            client_reference_id=str(user.id),
-            metadata={
-                'plan_id': str(plan.id),
-                'plan_name': plan.name,
+            'mode': 'subscription',
+            'success_url': success_url or default_success_url,
+            'cancel_url': cancel_url or default_cancel_url,
+            'allow_promotion_codes': True,
+            'billing_address_collection': 'required',
+            'customer_email': user.email if not customer_id else None,
+            'client_reference_id': str(user.id),
+            'metadata': {
+                'plan_id': str(plan['id']),
+                'plan_name': plan['name'],
                 'user_id': str(user.id),
             }
+        }
+        checkout_session = stripe.checkout.Session.create(
+            idempotency_key=_idempotency_key('checkout', session_params),
+            **session_params
         )
         
         return checkout_session.url
-    
-    def _create_stripe_customer(self, user):
-        """Create a Stripe customer for the user"""
-        try:
-            # Direct call to the Stripe API
-            stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-            customer = stripe.Customer.create(
-                email=user.email,
-                name=user.get_full_name() or user.username,
-                metadata={
-                    'user_id': str(user.id)
-                }
-            )
-            return customer.id
-        except Exception as e:
-            logger.error(f"Error creating Stripe customer: {e}")
-            raise
 
 
 class ProgrammableCheckoutView(APIView):
@@ -126,212 +202,120 @@ class ProgrammableCheckoutView(APIView):
     
     def post(self, request):
         """Create a customized checkout session based on request parameters"""
+        # Validate and coerce every parameter once, before any Stripe call
+        serializer = ProgrammableCheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': _error_message(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        mode = data['mode']
+        
+        # Fall back to the configured redirect URLs
+        success_url = data.get('success_url') or getattr(settings, 'STRIPE_SUCCESS_URL', None)
+        if data.get('ui_mode') == 'embedded':
+            # Stripe rejects success_url/cancel_url for embedded sessions
+            return_url = data.get('return_url') or success_url
+            if not return_url:
+                return Response({'error': 'return_url is required for embedded mode'}, status=status.HTTP_400_BAD_REQUEST)
+            redirect_params = {'return_url': return_url}
+        else:
+            if not success_url:
+                return Response({'error': 'success_url is required'}, status=status.HTTP_400_BAD_REQUEST)
+            cancel_url = data.get('cancel_url') or getattr(settings, 'STRIPE_CANCEL_URL', None)
+            if not cancel_url:
+                return Response({'error': 'cancel_url is required'}, status=status.HTTP_400_BAD_REQUEST)
+            redirect_params = {'success_url': success_url, 'cancel_url': cancel_url}
+        
         try:
-            # Required parameters
-            mode = request.data.get('mode', 'subscription')  # 'subscription', 'payment', or 'setup'
-            if mode not in ['subscription', 'payment', 'setup']:
-                return Response({'error': 'Invalid mode. Must be subscription, payment, or setup'}, 
-                               status=status.HTTP_400_BAD_REQUEST)
-            
             # Get or create customer
-            try:
-                customer = StripeCustomer.objects.get(user=request.user)
-                customer_id = customer.customer_id
-            except StripeCustomer.DoesNotExist:
-                # Create new customer
-                stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-                new_customer = stripe.Customer.create(
-                    email=request.user.email,
-                    name=request.user.get_full_name() or request.user.username,
-                    metadata={
-                        'user_id': str(request.user.id)
-                    }
-                )
-                customer = StripeCustomer.objects.create(
-                    user=request.user,
-                    customer_id=new_customer.id,
-                    livemode=not settings.STRIPE_SECRET_KEY.startswith('sk_test_')
-                )
-                customer_id = new_customer.id
+            customer_id = get_or_create_customer_id(request.user)
             
             # Build checkout session parameters
             session_params = {
                 'customer': customer_id,
                 'mode': mode,
+                **redirect_params,
                 'client_reference_id': str(request.user.id),
                 'metadata': {
                     'user_id': str(request.user.id),
                 }
             }
             
-            # Handle success_url
-            if 'success_url' in request.data:
-                session_params['success_url'] = request.data.get('success_url')
-            elif hasattr(settings, 'STRIPE_SUCCESS_URL'):
-                session_params['success_url'] = settings.STRIPE_SUCCESS_URL
-            else:
-                return Response({'error': 'success_url is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Handle cancel_url
-            if 'cancel_url' in request.data:
-                session_params['cancel_url'] = request.data.get('cancel_url')
-            elif hasattr(settings, 'STRIPE_CANCEL_URL'):
-                session_params['cancel_url'] = settings.STRIPE_CANCEL_URL
-            else:
-                return Response({'error': 'cancel_url is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
             # Handle line items based on mode
-            line_items = []
             if mode == 'subscription':
                 # For subscription, we need a price ID (Stripe Plan ID)
-                plan_id = request.data.get('plan_id')
-                if not plan_id:
-                    return Response({'error': 'plan_id is required for subscription mode'}, 
-                                  status=status.HTTP_400_BAD_REQUEST)
+                plan_id = data['plan_id']
                 
                 # Check if it's a plan in our database
                 try:
-                    plan = StripePlan.objects.get(plan_id=plan_id, active=True)
+                    plan = get_active_plan('plan_id', plan_id)
                     # Add plan metadata
-                    session_params['metadata']['plan_id'] = str(plan.id)
-                    session_params['metadata']['plan_name'] = plan.name
+                    session_params['metadata']['plan_id'] = str(plan['id'])
+                    session_params['metadata']['plan_name'] = plan['name']
                 except StripePlan.DoesNotExist:
                     # If plan doesn't exist in our DB, try to verify it exists in Stripe
                     try:
-                        stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-                        price = stripe.Price.retrieve(plan_id)
-                        if not price.active:
+                        if not is_price_active(plan_id):
                             return Response({'error': 'The selected price is inactive'}, 
                                            status=status.HTTP_400_BAD_REQUEST)
                     except Exception as e:
                         return Response({'error': f'Invalid plan_id: {str(e)}'}, 
                                        status=status.HTTP_400_BAD_REQUEST)
                 
-                line_items.append({
+                session_params['line_items'] = [{
                     'price': plan_id,
-                    'quantity': request.data.get('quantity', 1),
-                })
+                    'quantity': data['quantity'],
+                }]
                 
             elif mode == 'payment':
                 # For one-time payment, we need amount, currency, and product details
-                amount = request.data.get('amount')
-                currency = request.data.get('currency', 'usd')
-                product_name = request.data.get('product_name', 'One-time payment')
-                
-                if not amount:
-                    return Response({'error': 'amount is required for payment mode'}, 
-                                   status=status.HTTP_400_BAD_REQUEST)
-                
-                # Convert decimal amount to cents (Stripe uses smallest currency unit)
-                try:
-                    amount_in_cents = int(float(amount) * 100)
-                except ValueError:
-                    return Response({'error': 'amount must be a valid number'}, 
-                                   status=status.HTTP_400_BAD_REQUEST)
+                amount = data['amount']
+                currency = data['currency'].lower()
+                product_name = data['product_name']
                 
-                line_items.append({
+                session_params['line_items'] = [{
                     'price_data': {
-                        'currency': currency.lower(),
+                        'currency': currency,
                         'product_data': {
                             'name': product_name,
                         },
-                        'unit_amount': amount_in_cents,
+                        # Stripe uses the smallest currency unit
+                        'unit_amount': int(amount * 100),
                     },
                     'quantity': 1,
-                })
+                }]
                 
                 # Store payment description in metadata
                 session_params['metadata']['payment_description'] = product_name
                 session_params['metadata']['amount'] = str(amount)
-                session_params['metadata']['currency'] = currency.lower()
-            
-            # Add line items to session parameters
-            if mode != 'setup':  # setup mode doesn't use line_items
-                session_params['line_items'] = line_items
+                session_params['metadata']['currency'] = currency
+            # setup mode doesn't use line_items
             
             # Optional parameters
-            if request.data.get('allow_promotion_codes', True):
+            if data['allow_promotion_codes']:
                 session_params['allow_promotion_codes'] = True
                 
-            if request.data.get('billing_address_collection', True):
-                session_params['billing_address_collection'] = 'required'
+            if data['billing_address_collection']:
+                session_params['billing_address_collection'] = data['billing_address_collection']
                 
-            if request.data.get('tax_id_collection', False):
+            if data['tax_id_collection']:
                 session_params['tax_id_collection'] = {'enabled': True}
             
             # Advanced customization options
-            if 'ui_mode' in request.data:
-                session_params['ui_mode'] = request.data['ui_mode']  # 'hosted' or 'embedded'
-                
-            if 'custom_text' in request.data and isinstance(request.data['custom_text'], dict):
-                session_params['custom_text'] = request.data['custom_text']
-                
-            if 'custom_fields' in request.data and isinstance(request.data['custom_fields'], list):
-                session_params['custom_fields'] = request.data['custom_fields']
-                
-            if request.data.get('payment_method_types') and isinstance(request.data['payment_method_types'], list):
-                session_params['payment_method_types'] = request.data['payment_method_types']
-            
-            # Create checkout session
-            stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-            
-            # The integration test uses these parameters directly with stripe.checkout.Session.create
-            try:
-                checkout_session = stripe.checkout.Session.create(
-                    customer=customer_id,
-                    line_items=session_params.get('line_items', []),
-                    mode=session_params.get('mode', 'subscription'),
-                    success_url=session_params.get('success_url'),
-                    cancel_url=session_params.get('cancel_url'),
-                    allow_promotion_codes=session_params.get('allow_promotion_codes', True),
-                    billing_address_collection=session_params.get('billing_address_collection', 'required'),
-                    client_reference_id=session_params.get('client_reference_id'),
-                    metadata=session_params.get('metadata', {})
-                )
-                return Response({
-                    'sessionId': checkout_session.id,
-                    'url': checkout_session.url
-                })
-            except Exception as e:
-                logger.error(f"Stripe error: {str(e)}")
-                raise e
-            
-            # Include other optional parameters if they exist
-            if 'tax_id_collection' in session_params:
-                checkout_session = stripe.checkout.Session.modify(
-                    checkout_session.id,
-                    tax_id_collection=session_params['tax_id_collection']
-                )
-            
-            if 'ui_mode' in session_params:
-                checkout_session = stripe.checkout.Session.modify(
-                    checkout_session.id,
-                    ui_mode=session_params['ui_mode']
-                )
-            
-            if 'custom_text' in session_params:
-                checkout_session = stripe.checkout.Session.modify(
-                    checkout_session.id,
-                    custom_text=session_params['custom_text']
-                )
-            
-            if 'custom_fields' in session_params:
-                checkout_session = stripe.checkout.Session.modify(
-                    checkout_session.id,
-                    custom_fields=session_params['custom_fields']
-                )
-            
-            if 'payment_method_types' in session_params:
-                checkout_session = stripe.checkout.Session.modify(
-                    checkout_session.id,
-                    payment_method_types=session_params['payment_method_types']
-                )
+            for field in ('ui_mode', 'custom_text', 'custom_fields', 'payment_method_types'):
+                if data.get(field):
+                    session_params[field] = data[field]
+            
+            # Create checkout session; every optional field above goes in this single call
+            checkout_session = stripe.checkout.Session.create(
+                idempotency_key=_idempotency_key('checkout', session_params),
+                **session_params
+            )
             
             # Return response with checkout URL and session ID
             return Response({
                 'sessionId': checkout_session.id,
                 'url': checkout_session.url,
-                'clientSecret': checkout_session.client_secret if hasattr(checkout_session, 'client_secret') else None,
+                'clientSecret': getattr(checkout_session, 'client_secret', None),
             })
             
         except stripe.error.StripeError as e:
@@ -346,26 +330,29 @@ class CustomerPortalView(APIView):
     """Create a Stripe Customer Portal session for self-service subscription management"""
     permission_classes = [IsAuthenticated]
     
+    def _get_default_return_url(self, request):
+        """Return to the account page, preferring BASE_URL over parsing the request host"""
+        base_url = getattr(settings, 'BASE_URL', None)
+        if base_url:
+            return f"{base_url}/account/subscriptions/"
+        return request.build_absolute_uri('/account/subscriptions/')
+    
     def post(self, request):
         """Create a Stripe Customer Portal session and return the URL"""
         try:
             # Get the stripe customer id for the current user
             try:
-                stripe_customer = StripeCustomer.objects.get(user=request.user)
+                stripe_customer = StripeCustomer.objects.only('customer_id').get(user=request.user)
             except StripeCustomer.DoesNotExist:
                 return Response(
                     {'error': 'No Stripe customer found for this user'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Use direct stripe API call to create portal session
-            # This ensures we use the same API key that's configured in our tests
-            stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-            
             # Create billing portal session
             session = stripe.billing_portal.Session.create(
                 customer=stripe_customer.customer_id,
-                return_url=request.data.get('return_url') or request.build_absolute_uri('/account/subscriptions/'),
+                return_url=request.data.get('return_url') or self._get_default_return_url(request),
             )
             
             # Return the URL to the portal
@@ -390,8 +377,35 @@ class StripeWebhookView(APIView):
     authentication_classes = []  # No authentication for webhooks
     permission_classes = []  # No permissions for webhooks
     
+    # Event type -> handler method name, built once at import
+    _HANDLER_NAMES = {
+        'customer.subscription.created': '_handle_subscription_created',
+        'customer.subscription.updated': '_handle_subscription_updated',
+        'customer.subscription.deleted': '_handle_subscription_deleted',
+        'invoice.payment_succeeded': '_handle_invoice_payment_succeeded',
+        'invoice.payment_failed': '_handle_invoice_payment_failed',
+        'checkout.session.completed': '_handle_checkout_session_completed',
+        'customer.updated': '_handle_customer_updated',
+        'payment_intent.succeeded': '_handle_payment_intent_succeeded',
+        'payment_intent.payment_failed': '_handle_payment_intent_failed',
+        'charge.refunded': '_handle_charge_refunded',
+        'charge.dispute.created': '_handle_dispute_created',
+        'radar.early_fraud_warning.created': '_handle_fraud_warning_created',
+        'price.updated': '_handle_price_changed',
+        'price.deleted': '_handle_price_changed',
+        'product.updated': '_handle_product_updated',
+    }
+    
+    # Event type -> method making that event's Stripe API calls before its
+    # transaction opens; each returns extra keyword arguments for the handler
+    _PREFETCH_NAMES = {
+        'checkout.session.completed': '_prefetch_checkout_session',
+        'customer.subscription.created': '_prefetch_subscription_price',
+        'customer.subscription.updated': '_prefetch_subscription_price',
+        'product.updated': '_prefetch_product_prices',
+    }
+    
     def post(self, request):
-        stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
         payload = request.body
         sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
         
@@ -415,9 +429,24 @@ class StripeWebhookView(APIView):
         # Log event receipt for debugging/auditing
         logger.info(f"Stripe webhook received: {event.type} - {event.id}")
         
+        # Stripe retries deliveries; acknowledge repeats without reprocessing
+        if ProcessedStripeEvent.objects.filter(event_id=event.id).exists():
+            logger.info(f"Duplicate webhook event ignored: {event.id}")
+            return Response({'status': 'duplicate', 'event': event.type})
+        
         # Handle event based on type
         try:
-            handled = self.handle_event(event)
+            # Stripe API calls are made up front so no transaction waits on them
+            prefetched = self.prefetch_event(event)
+            
+            # Claim the event and apply its writes in one transaction; an error,
+            # crash or timeout rolls the claim back and Stripe's retry runs again
+            with transaction.atomic():
+                if is_duplicate_event(event.id):
+                    # A concurrent delivery committed its claim first
+                    logger.info(f"Duplicate webhook event ignored: {event.id}")
+                    return Response({'status': 'duplicate', 'event': event.type})
+                handled = self.handle_event(event, prefetched)
             
             if handled:
                 return Response({'status': 'success', 'event': event.type})
@@ -425,109 +454,108 @@ class StripeWebhookView(APIView):
                 logger.warning(f"Unhandled webhook event type: {event.type}")
                 return Response({'status': 'ignored', 'event': event.type})
         except CustomerNotFoundException as e:
+            # The claim was rolled back, so Stripe's retry is processed once the customer exists
             logger.error(f"Customer not found: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"Error handling webhook event: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def handle_event(self, event):
-        """Route event to appropriate handler method"""
-        handlers = {
-            'customer.subscription.created': self._handle_subscription_created,
-            'customer.subscription.updated': self._handle_subscription_updated,
-            'customer.subscription.deleted': self._handle_subscription_deleted,
-            'invoice.payment_succeeded': self._handle_invoice_payment_succeeded,
-            'invoice.payment_failed': self._handle_invoice_payment_failed,
-            'checkout.session.completed': self._handle_checkout_session_completed,
-            'customer.updated': self._handle_customer_updated,
-            'payment_intent.succeeded': self._handle_payment_intent_succeeded,
-            'payment_intent.payment_failed': self._handle_payment_intent_failed,
-            'charge.refunded': self._handle_charge_refunded,
-            'charge.dispute.created': self._handle_dispute_created,
-            'radar.early_fraud_warning.created': self._handle_fraud_warning_created,
-        }
+    def prefetch_event(self, event):
+        """Make an event's Stripe API calls, returning extra handler arguments"""
+        prefetch_name = self._PREFETCH_NAMES.get(event.type)
+        if prefetch_name:
+            return getattr(self, prefetch_name)(event.data.object)
+        return {}
+    
+    def handle_event(self, event, prefetched=None):
+        """Route event to appropriate handler method
         
-        handler = handlers.get(event.type)
-        if handler:
-            try:
-                handler(event.data.object)
-                return True
-            except CustomerNotFoundException:
-                # Re-raise customer not found exception to be caught by the post method
-                raise
-            except Exception as e:
-                logger.error(f"Error handling {event.type}: {str(e)}")
-                # Still return True as we've acknowledged receipt
-                return True
+        Handler errors propagate, so the caller's transaction rolls back the
+        event's claim and Stripe retries the delivery.
+        """
+        handler_name = self._HANDLER_NAMES.get(event.type)
+        if handler_name:
+            getattr(self, handler_name)(event.data.object, **(prefetched or {}))
+            return True
         
         return False
     
-    def _handle_checkout_session_completed(self, session):
+    def _prefetch_checkout_session(self, session):
+        """Retrieve a subscription checkout's subscription with its price and product"""
+        if not session.subscription:
+            return {}
+        # Expanding the first item's price and product avoids two more
+        # round-trips when the plan is unknown
+        return {'subscription': stripe.Subscription.retrieve(
+            session.subscription,
+            expand=['items.data.price.product'],
+        )}
+    
+    def _prefetch_subscription_price(self, subscription):
+        """Retrieve the subscription's price only when no local plan exists for it"""
+        plan_id = subscription.items.data[0].price.id
+        if StripePlan.objects.filter(plan_id=plan_id).exists():
+            return {}
+        return {'stripe_price': stripe.Price.retrieve(plan_id, expand=['product'])}
+    
+    def _handle_checkout_session_completed(self, session, subscription=None):
         """Handle checkout.session.completed webhook event"""
         # Check if this is a subscription checkout
         if not session.subscription:
             logger.info(f"Checkout session {session.id} was not for a subscription")
             return
         
+        # Get user from client_reference_id
+        user_id = session.client_reference_id
+        if not user_id:
+            logger.error(f"No client_reference_id in session {session.id}")
+            return
+        
         try:
-            # Get user from client_reference_id
-            user_id = session.client_reference_id
-            if not user_id:
-                logger.error(f"No client_reference_id in session {session.id}")
-                return
-            
             user = User.objects.get(id=user_id)
             
-            # Create or update Stripe customer
-            customer, created = StripeCustomer.objects.update_or_create(
-                user=user,
-                defaults={
-                    'customer_id': session.customer,
-                    'livemode': session.livemode,
-                }
-            )
-            
-            # Get subscription details
-            subscription = stripe.Subscription.retrieve(session.subscription)
+            # Get subscription details, unless the webhook prefetched them
+            if subscription is None:
+                subscription = self._prefetch_checkout_session(session)['subscription']
             
             # Get plan ID from the first subscription item
-            plan_id = subscription.items.data[0].price.id
+            stripe_price = subscription.items.data[0].price
+            plan_id = stripe_price.id
             
             # Get or create plan in our database
             try:
-                plan = StripePlan.objects.get(plan_id=plan_id)
+                plan = StripePlan.objects.only('plan_id', 'name', 'initial_credits').get(plan_id=plan_id)
             except StripePlan.DoesNotExist:
-                # Fetch plan details from Stripe
-                stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-                stripe_price = stripe.Price.retrieve(plan_id)
-                stripe_product = stripe.Product.retrieve(stripe_price.product)
+                # Plan details came back with the subscription
+                plan = self._backfill_plan(plan_id, session.livemode, stripe_price)
+            
+            # Write the customer and subscription together in one transaction
+            with transaction.atomic():
+                # Create or update Stripe customer
+                StripeCustomer.objects.update_or_create(
+                    user=user,
+                    defaults={
+                        'customer_id': session.customer,
+                        'livemode': session.livemode,
+                    }
+                )
                 
-                # Create local plan record
-                plan = StripePlan.objects.create(
-                    plan_id=plan_id,
-                    name=stripe_product.name,
-                    amount=stripe_price.unit_amount,
-                    currency=stripe_price.currency,
-                    interval=stripe_price.recurring.interval,
-                    initial_credits=self._get_initial_credits(stripe_product.metadata),
-                    monthly_credits=self._get_monthly_credits(stripe_product.metadata),
-                    livemode=session.livemode
+                # Create or update subscription record
+                sub, created = StripeSubscription.objects.update_or_create(
+                    subscription_id=subscription.id,
+                    defaults={
+                        'user': user,
+                        'status': subscription.status,
+                        'plan_id': plan_id,
+                        'current_period_start': _fromtimestamp(subscription.current_period_start, _UTC),
+                        'current_period_end': _fromtimestamp(subscription.current_period_end, _UTC),
+                        'cancel_at_period_end': subscription.cancel_at_period_end,
+                        'livemode': subscription.livemode,
+                    }
                 )
             
-            # Create or update subscription record
-            sub, created = StripeSubscription.objects.update_or_create(
-                subscription_id=subscription.id,
-                defaults={
-                    'user': user,
-                    'status': subscription.status,
-                    'plan_id': plan_id,
-                    'current_period_start': datetime.datetime.fromtimestamp(subscription.current_period_start, tz=datetime.timezone.utc),
-                    'current_period_end': datetime.datetime.fromtimestamp(subscription.current_period_end, tz=datetime.timezone.utc),
-                    'cancel_at_period_end': subscription.cancel_at_period_end,
-                    'livemode': subscription.livemode,
-                }
-            )
+            invalidate_dashboard(user.id)
             
             # Allocate initial credits for the subscription
             if created or sub.status != 'active':
@@ -535,10 +563,8 @@ class StripeWebhookView(APIView):
                 description = f"Initial credits for {plan.name} subscription"
                 allocate_subscription_credits(user, plan.initial_credits, description, subscription.id)
             
-            # Update user profile subscription tier if available
-            if hasattr(user, 'profile'):
-                user.profile.subscription_tier = map_plan_to_subscription_tier(plan.name)
-                user.profile.save(update_fields=['subscription_tier'])
+            # Update user profile subscription tier if available, without loading it
+            set_subscription_tier(user, map_plan_to_subscription_tier(plan.name))
             
             logger.info(f"Successfully processed subscription for user {user.id}")
             
@@ -546,14 +572,15 @@ class StripeWebhookView(APIView):
             logger.error(f"User {user_id} not found for checkout session {session.id}")
         except Exception as e:
             logger.error(f"Error processing checkout session {session.id}: {str(e)}")
+            raise
     
-    def _handle_subscription_created(self, subscription):
+    def _handle_subscription_created(self, subscription, stripe_price=None):
         """Handle subscription creation"""
         try:
             # Get customer and user
             customer_id = subscription.customer
             try:
-                customer = StripeCustomer.objects.get(customer_id=customer_id)
+                customer = StripeCustomer.objects.select_related('user').get(customer_id=customer_id)
                 user = customer.user
             except StripeCustomer.DoesNotExist:
                 logger.error(f"Customer {subscription.customer} not found for subscription {subscription.id}")
@@ -564,24 +591,9 @@ class StripeWebhookView(APIView):
             
             # Get or create plan in our database
             try:
-                plan = StripePlan.objects.get(plan_id=plan_id)
+                plan = StripePlan.objects.only('plan_id', 'name', 'initial_credits').get(plan_id=plan_id)
             except StripePlan.DoesNotExist:
-                # Fetch plan details from Stripe
-                stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-                stripe_price = stripe.Price.retrieve(plan_id)
-                stripe_product = stripe.Product.retrieve(stripe_price.product)
-                
-                # Create local plan record
-                plan = StripePlan.objects.create(
-                    plan_id=plan_id,
-                    name=stripe_product.name,
-                    amount=stripe_price.unit_amount,
-                    currency=stripe_price.currency,
-                    interval=stripe_price.recurring.interval,
-                    initial_credits=self._get_initial_credits(stripe_product.metadata),
-                    monthly_credits=self._get_monthly_credits(stripe_product.metadata),
-                    livemode=subscription.livemode
-                )
+                plan = self._backfill_plan(plan_id, subscription.livemode, stripe_price)
             
             # Create subscription record
             sub, created = StripeSubscription.objects.update_or_create(
@@ -590,29 +602,30 @@ class StripeWebhookView(APIView):
                     'user': user,
                     'status': subscription.status,
                     'plan_id': plan_id,
-                    'current_period_start': datetime.datetime.fromtimestamp(subscription.current_period_start, tz=datetime.timezone.utc),
-                    'current_period_end': datetime.datetime.fromtimestamp(subscription.current_period_end, tz=datetime.timezone.utc),
+                    'current_period_start': _fromtimestamp(subscription.current_period_start, _UTC),
+                    'current_period_end': _fromtimestamp(subscription.current_period_end, _UTC),
                     'cancel_at_period_end': subscription.cancel_at_period_end,
                     'livemode': subscription.livemode,
                 }
             )
             
+            invalidate_dashboard(user.id)
+            
             # Allocate initial credits for new subscription
             if created and subscription.status == 'active':
                 description = f"Initial credits for {plan.name} subscription"
                 allocate_subscription_credits(user, plan.initial_credits, description, subscription.id)
             
-            # Update user profile subscription tier if available
-            if hasattr(user, 'profile'):
-                user.profile.subscription_tier = map_plan_to_subscription_tier(plan.name)
-                user.profile.save(update_fields=['subscription_tier'])
+            # Update user profile subscription tier if available, without loading it
+            set_subscription_tier(user, map_plan_to_subscription_tier(plan.name))
             
             logger.info(f"Successfully processed new subscription {subscription.id} for user {user.id}")
             
         except Exception as e:
             logger.error(f"Error processing subscription creation {subscription.id}: {str(e)}")
+            raise
     
-    def _handle_subscription_updated(self, subscription):
+    def _handle_subscription_updated(self, subscription, stripe_price=None):
         """Handle subscription updates"""
         try:
             # Check if customer exists first
@@ -625,13 +638,13 @@ class StripeWebhookView(APIView):
                 
             # Find the subscription in our database
             try:
-                sub = StripeSubscription.objects.get(subscription_id=subscription.id)
+                sub = StripeSubscription.objects.select_related('user').only('user', 'plan').get(subscription_id=subscription.id)
                 user = sub.user
                 old_plan_id = sub.plan_id
             except StripeSubscription.DoesNotExist:
                 logger.error(f"Subscription {subscription.id} not found in database")
                 # Call subscription_created handler to create the subscription
-                self._handle_subscription_created(subscription)
+                self._handle_subscription_created(subscription, stripe_price)
                 return
             
             # Get new plan ID
@@ -639,43 +652,28 @@ class StripeWebhookView(APIView):
             
             # If plan has changed, handle plan change
             if old_plan_id != new_plan_id:
-                try:
-                    # Get old and new plans
-                    old_plan = StripePlan.objects.get(plan_id=old_plan_id)
-                    try:
-                        new_plan = StripePlan.objects.get(plan_id=new_plan_id)
-                    except StripePlan.DoesNotExist:
-                        # Fetch new plan details from Stripe
-                        stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
-                        stripe_price = stripe.Price.retrieve(new_plan_id)
-                        stripe_product = stripe.Product.retrieve(stripe_price.product)
-                        
-                        # Create local plan record
-                        new_plan = StripePlan.objects.create(
-                            plan_id=new_plan_id,
-                            name=stripe_product.name,
-                            amount=stripe_price.unit_amount,
-                            currency=stripe_price.currency,
-                            interval=stripe_price.recurring.interval,
-                            initial_credits=self._get_initial_credits(stripe_product.metadata),
-                            monthly_credits=self._get_monthly_credits(stripe_product.metadata),
-                            livemode=subscription.livemode
-                        )
+                # Resolve old and new plans with a single query
+                plans = get_plans_by_id([old_plan_id, new_plan_id])
+                old_plan = plans.get(old_plan_id)
+                if old_plan is None:
+                    logger.error(f"Old plan {old_plan_id} not found for subscription {subscription.id}")
+                else:
+                    new_plan = plans.get(new_plan_id)
+                    if new_plan is None:
+                        new_plan = self._backfill_plan(new_plan_id, subscription.livemode, stripe_price)
                     
                     # Handle credit adjustments for plan change
                     handle_subscription_change(user, old_plan, new_plan, subscription.id)
-                    
-                except StripePlan.DoesNotExist:
-                    logger.error(f"Old plan {old_plan_id} not found for subscription {subscription.id}")
             
             # Update subscription record
             sub.status = subscription.status
             sub.plan_id = new_plan_id
-            sub.current_period_start = datetime.datetime.fromtimestamp(subscription.current_period_start, tz=datetime.timezone.utc)
-            sub.current_period_end = datetime.datetime.fromtimestamp(subscription.current_period_end, tz=datetime.timezone.utc)
+            sub.current_period_start = _fromtimestamp(subscription.current_period_start, _UTC)
+            sub.current_period_end = _fromtimestamp(subscription.current_period_end, _UTC)
             sub.cancel_at_period_end = subscription.cancel_at_period_end
             sub.updated_at = timezone.now()
-            sub.save()
+            sub.save(update_fields=['status', 'plan', 'current_period_start', 'current_period_end', 'cancel_at_period_end', 'updated_at'])
+            invalidate_dashboard(user.id)
             
             logger.info(f"Successfully updated subscription {subscription.id} for user {user.id}")
             
@@ -684,13 +682,14 @@ class StripeWebhookView(APIView):
             raise
         except Exception as e:
             logger.error(f"Error processing subscription update {subscription.id}: {str(e)}")
+            raise
     
     def _handle_subscription_deleted(self, subscription):
         """Handle subscription deletion/cancellation"""
         try:
             # Find the subscription in our database
             try:
-                sub = StripeSubscription.objects.get(subscription_id=subscription.id)
+                sub = StripeSubscription.objects.select_related('user').only('user').get(subscription_id=subscription.id)
                 user = sub.user
             except StripeSubscription.DoesNotExist:
                 logger.error(f"Subscription {subscription.id} not found in database for deletion")
@@ -699,18 +698,17 @@ class StripeWebhookView(APIView):
             # Update subscription status
             sub.status = subscription.status
             sub.updated_at = timezone.now()
-            sub.save()
+            sub.save(update_fields=['status', 'updated_at'])
+            invalidate_dashboard(user.id)
             
-            # Update user profile subscription tier if available
-            if hasattr(user, 'profile'):
-                # Downgrade to free tier when subscription is cancelled
-                user.profile.subscription_tier = 'free'
-                user.profile.save(update_fields=['subscription_tier'])
+            # Downgrade to free tier when subscription is cancelled, without loading the profile
+            set_subscription_tier(user, 'free')
             
             logger.info(f"Successfully processed subscription cancellation {subscription.id} for user {user.id}")
             
         except Exception as e:
             logger.error(f"Error processing subscription deletion {subscription.id}: {str(e)}")
+            raise
     
     def _handle_invoice_payment_succeeded(self, invoice):
         """Handle successful invoice payment"""
@@ -721,16 +719,20 @@ class StripeWebhookView(APIView):
         try:
             # Find the subscription in our database
             try:
-                sub = StripeSubscription.objects.get(subscription_id=invoice.subscription)
+                sub = StripeSubscription.objects.select_related('user', 'plan').only(
+                    'user', 'plan', 'plan__name', 'plan__monthly_credits',
+                ).get(subscription_id=invoice.subscription)
                 user = sub.user
             except StripeSubscription.DoesNotExist:
                 logger.error(f"Subscription {invoice.subscription} not found for invoice {invoice.id}")
                 return
             
+            # The dashboard shows this as the subscription's latest invoice
+            invalidate_dashboard(user.id)
+            
             # Get plan details
-            try:
-                plan = StripePlan.objects.get(plan_id=sub.plan_id)
-            except StripePlan.DoesNotExist:
+            plan = sub.plan
+            if plan is None:
                 logger.error(f"Plan {sub.plan_id} not found for subscription {invoice.subscription}")
                 return
             
@@ -743,6 +745,7 @@ class StripeWebhookView(APIView):
             
         except Exception as e:
             logger.error(f"Error processing invoice payment {invoice.id}: {str(e)}")
+            raise
     
     def _handle_invoice_payment_failed(self, invoice):
         """Handle failed invoice payment"""
@@ -753,7 +756,7 @@ class StripeWebhookView(APIView):
         try:
             # Find the subscription in our database
             try:
-                sub = StripeSubscription.objects.get(subscription_id=invoice.subscription)
+                sub = StripeSubscription.objects.select_related('user').only('user', 'status').get(subscription_id=invoice.subscription)
                 user = sub.user
             except StripeSubscription.DoesNotExist:
                 logger.error(f"Subscription {invoice.subscription} not found for failed invoice {invoice.id}")
@@ -763,6 +766,7 @@ class StripeWebhookView(APIView):
             if sub.status != invoice.billing_reason:
                 sub.status = 'past_due'  # Most common status after payment failure
                 sub.save(update_fields=['status'])
+            invalidate_dashboard(user.id)
             
             # Could implement notification to user here
             
@@ -770,6 +774,7 @@ class StripeWebhookView(APIView):
             
         except Exception as e:
             logger.error(f"Error processing invoice payment failure {invoice.id}: {str(e)}")
+            raise
     
     def _handle_customer_updated(self, customer):
         """Handle customer updates"""
@@ -801,6 +806,50 @@ class StripeWebhookView(APIView):
         # This would be implemented to handle fraud warnings
         logger.info(f"Fraud warning created: {warning.id}")
     
+    def _handle_price_changed(self, price):
+        """Evict a changed price from the checkout lookup cache"""
+        cache.delete(_price_cache_key(price.id))
+        logger.info(f"Price changed: {price.id}")
+    
+    def _prefetch_product_prices(self, product):
+        """List the IDs of every price under an updated product"""
+        prices = stripe.Price.list(product=product.id, limit=100)
+        return {'price_ids': [price.id for price in prices.auto_paging_iter()]}
+    
+    def _handle_product_updated(self, product, price_ids=None):
+        """Drop cached checkout data for every price under an updated product"""
+        if price_ids is None:
+            price_ids = self._prefetch_product_prices(product)['price_ids']
+        cache.delete_many([_price_cache_key(price_id) for price_id in price_ids])
+        evict_plans(StripePlan.objects.filter(plan_id__in=price_ids).values_list('id', 'plan_id'))
+        logger.info(f"Evicted cached prices and plans for product {product.id}")
+    
+    def _backfill_plan(self, plan_id, livemode, stripe_price=None):
+        """Create the local plan record for a price we have not seen yet
+        
+        Pass a price retrieved with its product expanded to skip the Stripe
+        call. If a concurrent webhook creates the row first, get_or_create
+        returns that row instead of raising IntegrityError.
+        """
+        if stripe_price is None:
+            # Fetch plan details from Stripe; the product comes back expanded
+            stripe_price = stripe.Price.retrieve(plan_id, expand=['product'])
+        stripe_product = stripe_price.product
+        
+        plan, created = StripePlan.objects.get_or_create(
+            plan_id=plan_id,
+            defaults={
+                'name': stripe_product.name,
+                'amount': stripe_price.unit_amount,
+                'currency': stripe_price.currency,
+                'interval': stripe_price.recurring.interval,
+                'initial_credits': self._get_initial_credits(stripe_product.metadata),
+                'monthly_credits': self._get_monthly_credits(stripe_product.metadata),
+                'livemode': livemode,
+            }
+        )
+        return plan
+    
     def _get_initial_credits(self, metadata):
         """Extract initial credits from product metadata"""
         try:
@@ -823,6 +872,13 @@ class CustomerDashboardView(APIView):
     def get(self, request):
         """Retrieve subscription info for the current user"""
         try:
+            # Serve a recent payload if no webhook has changed this user since;
+            # the key is read first so a concurrent bump is never masked
+            cache_key = _dashboard_cache_key(request.user.id)
+            payload = cache.get(cache_key)
+            if payload is not None:
+                return Response(payload)
+            
             # Check if user has a stripe customer record
             try:
                 stripe_customer = StripeCustomer.objects.get(user=request.user)
@@ -836,45 +892,50 @@ class CustomerDashboardView(APIView):
             # Get Stripe client
             stripe_client = get_stripe_client()
             
-            # Get user's active subscriptions
-            subscriptions = StripeSubscription.objects.filter(user=request.user)
+            # Get user's active subscriptions, joining their plans in the same query
+            subscriptions = StripeSubscription.objects.filter(user=request.user).select_related('plan').only(
+                'subscription_id', 'status', 'plan', 'current_period_start', 'current_period_end',
+                'cancel_at_period_end', 'livemode',
+                'plan__name', 'plan__amount', 'plan__currency', 'plan__interval',
+            )
             subscription_data = []
             
-            for sub in subscriptions:
-                try:
-                    # Get plan details
-                    plan = StripePlan.objects.get(plan_id=sub.plan_id)
-                    
-                    # Fetch latest invoice for this subscription
-                    latest_invoice = None
-                    try:
-                        stripe_sub = stripe_client.subscriptions.retrieve(sub.subscription_id)
-                        if stripe_sub.latest_invoice:
-                            latest_invoice = stripe_client.invoices.retrieve(stripe_sub.latest_invoice)
-                    except Exception as e:
-                        logger.error(f"Error fetching invoice data: {str(e)}")
-                    
-                    subscription_data.append({
-                        'id': sub.subscription_id,
-                        'status': sub.status,
-                        'plan_name': plan.name,
-                        'amount': plan.amount / 100,  # Convert cents to dollars/etc
-                        'currency': plan.currency.upper(),
-                        'interval': plan.interval,
-                        'current_period_start': sub.current_period_start,
-                        'current_period_end': sub.current_period_end,
-                        'cancel_at_period_end': sub.cancel_at_period_end,
-                        'dashboard_url': sub.get_dashboard_url() if request.user.is_staff else None,
-                        'latest_invoice': {
-                            'id': latest_invoice.id if latest_invoice else None,
-                            'amount_paid': latest_invoice.amount_paid / 100 if latest_invoice else None,
-                            'currency': latest_invoice.currency.upper() if latest_invoice else None,
-                            'invoice_pdf': latest_invoice.invoice_pdf if latest_invoice else None,
-                            'status': latest_invoice.status if latest_invoice else None,
-                            'hosted_invoice_url': latest_invoice.hosted_invoice_url if latest_invoice else None,
-                        } if latest_invoice else None
-                    })
-                except StripePlan.DoesNotExist:
+            # The three Stripe reads below are independent, so issue them together
+            # over the pooled HTTP client; errors surface from result() as before
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                # Every Stripe subscription for the customer with its latest
+                # invoice expanded in one call, instead of two retrieves per row
+                stripe_subs_future = executor.submit(stripe_client.subscriptions.list, params={
+                    'customer': stripe_customer.customer_id,
+                    'status': 'all',
+                    'limit': 100,
+                    'expand': ['data.latest_invoice'],
+                })
+                # Payment methods attached to the customer
+                payment_methods_future = executor.submit(stripe_client.payment_methods.list, params={
+                    'customer': stripe_customer.customer_id,
+                    'type': 'card',
+                })
+                # The customer itself, for its default payment method
+                stripe_customer_future = executor.submit(
+                    stripe_client.customers.retrieve, stripe_customer.customer_id
+                )
+            
+            # A payload missing Stripe data is returned but not cached
+            stripe_failed = False
+            latest_invoices = {}
+            try:
+                stripe_subs = stripe_subs_future.result()
+                latest_invoices = {stripe_sub.id: stripe_sub.latest_invoice for stripe_sub in stripe_subs.data}
+            except Exception as e:
+                logger.error(f"Error fetching invoice data: {str(e)}")
+                stripe_failed = True
+            
+            # Stream rows in chunks; each is used once, so the queryset cache is skipped
+            for sub in subscriptions.iterator(chunk_size=100):
+                # Get plan details; None when the plan has not been synced yet
+                plan = sub.plan
+                if plan is None:
                     # Plan not found, still return basic subscription data
                     subscription_data.append({
                         'id': sub.subscription_id,
@@ -884,15 +945,39 @@ class CustomerDashboardView(APIView):
                         'current_period_end': sub.current_period_end,
                         'cancel_at_period_end': sub.cancel_at_period_end,
                     })
+                    continue
+                
+                # Latest invoice for this subscription, if Stripe returned one
+                latest_invoice = latest_invoices.get(sub.subscription_id)
+                
+                subscription_data.append({
+                    'id': sub.subscription_id,
+                    'status': sub.status,
+                    'plan_name': plan.name,
+                    'amount': plan.amount / 100,  # Convert cents to dollars/etc
+                    'currency': plan.currency.upper(),
+                    'interval': plan.interval,
+                    'current_period_start': sub.current_period_start,
+                    'current_period_end': sub.current_period_end,
+                    'cancel_at_period_end': sub.cancel_at_period_end,
+                    'dashboard_url': sub.get_dashboard_url() if request.user.is_staff else None,
+                    'latest_invoice': {
+                        'id': latest_invoice.id if latest_invoice else None,
+                        'amount_paid': latest_invoice.amount_paid / 100 if latest_invoice else None,
+                        'currency': latest_invoice.currency.upper() if latest_invoice else None,
+                        'invoice_pdf': latest_invoice.invoice_pdf if latest_invoice else None,
+                        'status': latest_invoice.status if latest_invoice else None,
+                        'hosted_invoice_url': latest_invoice.hosted_invoice_url if latest_invoice else None,
+                    } if latest_invoice else None
+                })
             
             # Get payment methods
             payment_methods = []
             try:
-                # Retrieve payment methods attached to the customer
-                stripe_payment_methods = stripe_client.payment_methods.list(
-                    customer=stripe_customer.customer_id,
-                    type='card'
-                )
+                stripe_payment_methods = payment_methods_future.result()
+                
+                # Look up the default payment method once, not once per card
+                default_payment_method = stripe_customer_future.result().invoice_settings.default_payment_method
                 
                 # Format payment method data
                 for pm in stripe_payment_methods.data:
@@ -902,19 +987,23 @@ class CustomerDashboardView(APIView):
                         'last4': pm.card.last4,
                         'exp_month': pm.card.exp_month,
                         'exp_year': pm.card.exp_year,
-                        'is_default': pm.id == stripe_client.customers.retrieve(stripe_customer.customer_id).invoice_settings.default_payment_method
+                        'is_default': pm.id == default_payment_method
                     })
             except Exception as e:
                 logger.error(f"Error fetching payment methods: {str(e)}")
+                stripe_failed = True
             
             # Return comprehensive dashboard data
-            return Response({
+            payload = {
                 'has_customer': True,
                 'customer_id': stripe_customer.customer_id,
                 'customer_dashboard_url': stripe_customer.get_dashboard_url() if request.user.is_staff else None,
                 'subscriptions': subscription_data,
                 'payment_methods': payment_methods
-            })
+            }
+            if not stripe_failed:
+                cache.set(cache_key, payload, timeout=DASHBOARD_CACHE_TIMEOUT)
+            return Response(payload)
             
         except Exception as e:
             logger.error(f"Error retrieving dashboard data: {str(e)}")
@@ -932,57 +1021,46 @@ class ProductManagementView(APIView):
         """Create a new product with optional pricing plans"""
         try:
             stripe_client = get_stripe_client()
+            # Bound once; request.data is read throughout
+            data = request.data
             
             # Product details
             product_data = {
-                'name': request.data.get('name'),
-                'active': request.data.get('active', True),
+                'name': data.get('name'),
+                'active': data.get('active', True),
             }
             
             # Optional product fields
             optional_fields = ['description', 'id', 'statement_descriptor', 'unit_label', 'url']
             for field in optional_fields:
-                if field in request.data:
-                    product_data[field] = request.data[field]
-            
-            # Handle metadata
-            if 'metadata' in request.data and isinstance(request.data['metadata'], dict):
-                # Add credit information to metadata if provided
-                metadata = request.data['metadata']
-                if 'initial_credits' not in metadata and 'initial_credits' in request.data:
-                    metadata['initial_credits'] = request.data['initial_credits']
-                if 'monthly_credits' not in metadata and 'monthly_credits' in request.data:
-                    metadata['monthly_credits'] = request.data['monthly_credits']
-                if 'subscription_tier' not in metadata and 'subscription_tier' in request.data:
-                    metadata['subscription_tier'] = request.data['subscription_tier']
-                
+                if field in data:
+                    product_data[field] = data[field]
+            
+            # Handle metadata, adding credit information given at the top level
+            metadata = dict(data['metadata']) if isinstance(data.get('metadata'), dict) else {}
+            for key in ('initial_credits', 'monthly_credits', 'subscription_tier'):
+                if key in data and key not in metadata:
+                    metadata[key] = data[key]
+            if metadata:
                 product_data['metadata'] = metadata
-            elif any(key in request.data for key in ['initial_credits', 'monthly_credits', 'subscription_tier']):
-                # Create metadata if it doesn't exist but credit info is provided
-                product_data['metadata'] = {}
-                if 'initial_credits' in request.data:
-                    product_data['metadata']['initial_credits'] = request.data['initial_credits']
-                if 'monthly_credits' in request.data:
-                    product_data['metadata']['monthly_credits'] = request.data['monthly_credits']
-                if 'subscription_tier' in request.data:
-                    product_data['metadata']['subscription_tier'] = request.data['subscription_tier']
             
             # Handle images
-            if 'images' in request.data and isinstance(request.data['images'], list):
-                product_data['images'] = request.data['images']
+            if isinstance(data.get('images'), list):
+                product_data['images'] = data['images']
             
             # Handle tax code
-            if 'tax_code' in request.data:
-                product_data['tax_code'] = request.data['tax_code']
+            if 'tax_code' in data:
+                product_data['tax_code'] = data['tax_code']
             
             # Create the product
-            stripe.api_key = settings.STRIPE_SECRET_KEY_TEST if getattr(settings, 'TESTING', False) else settings.STRIPE_SECRET_KEY
             product = stripe_client.products.create(**product_data)
             
             # Create pricing plans if included
             created_prices = []
-            if 'pricing_plans' in request.data and isinstance(request.data['pricing_plans'], list):
-                for plan_data in request.data['pricing_plans']:
+            # Local rows for recurring prices, inserted together after the loop
+            new_plans = []
+            if isinstance(data.get('pricing_plans'), list):
+                for plan_data in data['pricing_plans']:
                     if not isinstance(plan_data, dict):
                         continue
                     
@@ -1032,7 +1110,7 @@ class ProductManagementView(APIView):
                     
                     # Create local plan record if it has recurring parameters (subscription)
                     if 'recurring' in price_data:
-                        StripePlan.objects.create(
+                        new_plans.append(StripePlan(
                             plan_id=price.id,
                             name=f"{product.name} - {price_data.get('nickname', price.id)}",
                             amount=price_data['unit_amount'],
@@ -1040,9 +1118,13 @@ class ProductManagementView(APIView):
                             interval=price_data['recurring']['interval'],
                             initial_credits=int(product_data.get('metadata', {}).get('initial_credits', 0)),
                             monthly_credits=int(product_data.get('metadata', {}).get('monthly_credits', 0)),
-                            livemode=not settings.STRIPE_SECRET_KEY.startswith('sk_test_'),
+                            livemode=not StripeConfig.is_test_mode(),
                             active=price_data.get('active', True)
-                        )
+                        ))
+            
+            # One INSERT for every local plan instead of one per price
+            if new_plans:
+                StripePlan.objects.bulk_create(new_plans, batch_size=100)
             
             # Prepare response data
             response_data = {
@@ -1067,42 +1149,47 @@ class ProductManagementView(APIView):
             # Get query parameters for filtering
             active_only = request.query_params.get('active', 'true').lower() == 'true'
             
-            # Retrieve products from Stripe
-            products = stripe_client.products.list(
-                active=active_only if active_only else None,
-                limit=100  # Adjust as needed
-            )
-            
-            # Retrieve all prices for these products
-            all_prices = stripe_client.prices.list(limit=100)  # Adjust as needed
+            # List every product and every price, following Stripe's pagination;
+            # the two listings are independent, so page through them together
+            product_params = {'limit': 100}
+            if active_only:
+                product_params['active'] = True
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                products_future = executor.submit(
+                    lambda: list(stripe_client.products.list(params=product_params).auto_paging_iter())
+                )
+                prices_future = executor.submit(
+                    lambda: list(stripe_client.prices.list(params={'limit': 100}).auto_paging_iter())
+                )
+            products = products_future.result()
+            all_prices = prices_future.result()
             
-            # Organize prices by product
+            # Organize prices by product; price.product stays the product ID
             prices_by_product = {}
-            for price in all_prices.data:
-                if price.product not in prices_by_product:
-                    prices_by_product[price.product] = []
-                prices_by_product[price.product].append(price)
+            for price in all_prices:
+                prices_by_product.setdefault(price.product, []).append(price)
+            
+            # Load the local plans for every recurring price in one query
+            local_plans_by_price = get_plans_by_id(
+                price.id for price in all_prices if getattr(price, 'recurring', None)
+            )
             
             # Build response data
             response_data = []
-            for product in products.data:
+            for product in products:
                 product_prices = prices_by_product.get(product.id, [])
                 
                 # Get local subscription plans for additional details
                 local_plans = []
                 for price in product_prices:
-                    try:
-                        if hasattr(price, 'recurring') and price.recurring:
-                            plan = StripePlan.objects.filter(plan_id=price.id).first()
-                            if plan:
-                                local_plans.append({
-                                    'id': plan.id,
-                                    'initial_credits': plan.initial_credits,
-                                    'monthly_credits': plan.monthly_credits,
-                                    'active': plan.active
-                                })
-                    except Exception as e:
-                        logger.error(f"Error getting local plan for price {price.id}: {str(e)}")
+                    plan = local_plans_by_price.get(price.id)
+                    if plan:
+                        local_plans.append({
+                            'id': plan.id,
+                            'initial_credits': plan.initial_credits,
+                            'monthly_credits': plan.monthly_credits,
+                            'active': plan.active
+                        })
                 
                 response_data.append({
                     'product': product,